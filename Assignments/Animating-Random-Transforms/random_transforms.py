@@ -0,0 +1,299 @@
+'''
+Vectorized random transform animation.
+
+animate_random_transforms.py sets one attribute at a time with setAttr
+and moves currentTime before keying each shape, so every shape costs a
+scene evaluation and a dozen commands. This module draws every translate,
+rotate and scale value of N objects over K keys at once from a seeded
+NumPy generator, then writes them straight into the animation curves at
+explicit times: one addKeys() call per curve (apply_transforms), or
+setKeyframe calls with an explicit time and value (apply_transforms_cmds).
+currentTime is never changed.
+
+To animate some random shapes, run this inside Maya:
+
+import random_transforms
+random_transforms.animate_random_shapes(15, seed=1)
+
+To benchmark the original loop against both writers in mayapy, or only
+the value generation with plain Python:
+
+mayapy random_transforms.py
+python random_transforms.py
+'''
+
+import random
+import timeit
+
+import numpy
+
+
+# Channels written for each object, in the order of the last axis of the values
+ATTRIBUTES = ['translateX', 'translateY', 'translateZ',
+              'rotateX', 'rotateY', 'rotateZ',
+              'scaleX', 'scaleY', 'scaleZ']
+
+# Inclusive (low, high) whole-number ranges of each channel, the same as the
+# rand_*_val() functions of animate_random_transforms.py
+VALUE_RANGES = {'translate': (-10, 10),
+                'rotate': (0, 180),
+                'scale': (1, 3)}
+
+
+###############  Generation  ###############
+
+
+def generate_transforms(object_count, key_count, start_time, end_time, seed=None):
+    '''
+    Draws random key times and transform values for object_count objects
+
+        Parameters:
+            object_count (int): Number of objects
+            key_count (int): Keys per object, the first is always at start_time,
+                at most one per frame from start_time to end_time
+            start_time (int): First frame a key can be on
+            end_time (int): Last frame a key can be on
+            seed (int): Seed of the generator, None for a random one
+
+        Returns:
+            (times, values): times is an (object_count, key_count) array of whole,
+            strictly increasing frames, as MFnAnimCurve.addKeys() expects. values
+            is an (object_count, key_count, 9) array in ATTRIBUTES order, rotations
+            in degrees
+    '''
+    rng = numpy.random.RandomState(seed)
+    start_time = int(start_time)
+    end_time = int(end_time)
+
+    if key_count < 1 or key_count > end_time - start_time + 1:
+        raise ValueError('Cannot place {} keys on frames {} to {}'.format(key_count, start_time, end_time))
+
+    times = numpy.empty((object_count, key_count), dtype=numpy.float64)
+    times[:, 0] = start_time
+
+    # the other keys are on distinct frames after start_time: the frames of the
+    # key_count - 1 smallest of a row of random numbers, one per frame
+    if key_count > 1:
+        order = rng.random_sample((object_count, end_time - start_time))
+        frames = numpy.argpartition(order, key_count - 2, axis=1)[:, :key_count - 1]
+        times[:, 1:] = numpy.sort(frames, axis=1) + start_time + 1
+
+    values = numpy.empty((object_count, key_count, len(ATTRIBUTES)), dtype=numpy.float64)
+    for i, attribute in enumerate(ATTRIBUTES):
+        low, high = VALUE_RANGES[attribute[:-1]]
+        values[:, :, i] = rng.randint(low, high + 1, (object_count, key_count))
+
+    return times, values
+
+
+###############  Writing Keys  ###############
+
+
+def apply_transforms(objects, times, values):
+    '''
+    Keys values onto objects at times with one MFnAnimCurve.addKeys() call per
+    curve. Existing keys on the channels are replaced. This goes through the
+    API, so it is not undoable.
+
+        Parameters:
+            objects (list of strings): Transform nodes, one per row of times
+            times (array): (objects, keys) frames, see generate_transforms()
+            values (array): (objects, keys, 9) values in ATTRIBUTES order
+    '''
+    import maya.api.OpenMaya as om
+    import maya.api.OpenMayaAnim as oma
+
+    # curves store linear values in centimeters and angles in radians
+    unit_scale = numpy.ones(len(ATTRIBUTES))
+    unit_scale[0:3] = om.MDistance.uiToInternal(1.0)
+    unit_scale[3:6] = om.MAngle.uiToInternal(1.0)
+    values = values * unit_scale
+
+    selection = om.MSelectionList()
+    for o in objects:
+        selection.add(o)
+
+    time_unit = om.MTime.uiUnit()
+    curve_fn = oma.MFnAnimCurve()
+
+    for index in range(len(objects)):
+        node_fn = om.MFnDependencyNode(selection.getDependNode(index))
+        key_times = om.MTimeArray([om.MTime(t, time_unit) for t in times[index]])
+
+        for channel, attribute in enumerate(ATTRIBUTES):
+            plug = node_fn.findPlug(attribute, False)
+
+            if not plug.isDestination:
+                curve_fn.create(plug)
+            elif plug.source().node().hasFn(om.MFn.kAnimCurve):
+                curve_fn.setObject(plug.source().node())
+            else:
+                print('Skipping {}.{}, it is driven by {}'.format(
+                    objects[index], attribute, plug.source().name()))
+                continue
+
+            curve_fn.addKeys(key_times, om.MDoubleArray(values[index, :, channel].tolist()),
+                             keepExistingKeys=False)
+
+
+def apply_transforms_cmds(objects, times, values):
+    '''
+    Keys values onto objects at times with one setKeyframe call per key, each
+    given its time and value, so currentTime is never changed. Slower than
+    apply_transforms(), but undoable.
+
+        Parameters:
+            objects (list of strings): Transform nodes, one per row of times
+            times (array): (objects, keys) frames, see generate_transforms()
+            values (array): (objects, keys, 9) values in ATTRIBUTES order
+    '''
+    import maya.cmds
+
+    times = times.tolist()
+    values = values.tolist()
+
+    for o, object_times, object_values in zip(objects, times, values):
+        for t, key_values in zip(object_times, object_values):
+            for attribute, v in zip(ATTRIBUTES, key_values):
+                maya.cmds.setKeyframe(o, attribute=attribute, time=t, value=v)
+
+
+def animate_random_shapes(count, key_count=2, seed=None):
+    '''
+    Creates count random poly shapes and keys random transforms onto them over
+    the playback range, as animate_random_transforms.py does
+
+        Parameters:
+            count (int): Number of shapes
+            key_count (int): Keys per shape
+            seed (int): Seed of the generator, None for a random one
+
+        Returns:
+            The names of the shapes' transforms
+    '''
+    import maya.cmds
+
+    start_time = maya.cmds.playbackOptions(query=True, min=True)
+    end_time = maya.cmds.playbackOptions(query=True, max=True)
+
+    shape_commands = [maya.cmds.polyCube, maya.cmds.polySphere, maya.cmds.polyCone,
+                      maya.cmds.polyTorus, maya.cmds.polyCylinder]
+    choices = numpy.random.RandomState(seed).randint(0, len(shape_commands), count)
+    shapes = [shape_commands[c]()[0] for c in choices]
+
+    times, values = generate_transforms(count, key_count, start_time, end_time, seed)
+    apply_transforms(shapes, times, values)
+
+    maya.cmds.select(cl=True)
+
+    return shapes
+
+
+###############  Benchmark  ###############
+
+
+def rand_translate_val(): return random.randint(-10, 10)
+def rand_rotate_val(): return random.randint(0, 180)
+def rand_scale_val(): return random.randint(1, 3)
+
+
+def loop_values(object_count, start_time, end_time):
+    ''' The original value generation, one random.randint call per value, kept for comparison '''
+    result = []
+    for _ in range(object_count):
+        first = [rand_translate_val() for _ in range(3)]
+        time = random.randint(start_time, end_time)
+        second = ([rand_translate_val() for _ in range(3)] +
+                  [rand_rotate_val() for _ in range(3)] +
+                  [rand_scale_val() for _ in range(3)])
+        result.append((first, time, second))
+    return result
+
+
+def loop_animate(objects, start_time, end_time):
+    ''' The original animate_random_transforms.py loop, kept for comparison '''
+    import maya.cmds
+
+    maya.cmds.currentTime(start_time)
+
+    for s in objects:
+        maya.cmds.setAttr(s + '.translateX', rand_translate_val())
+        maya.cmds.setAttr(s + '.translateY', rand_translate_val())
+        maya.cmds.setAttr(s + '.translateZ', rand_translate_val())
+
+    for s in objects:
+        maya.cmds.setKeyframe(s)
+
+        maya.cmds.currentTime(random.randint(start_time, end_time))
+
+        maya.cmds.setAttr(s + '.scaleX', rand_scale_val())
+        maya.cmds.setAttr(s + '.scaleY', rand_scale_val())
+        maya.cmds.setAttr(s + '.scaleZ', rand_scale_val())
+
+        maya.cmds.setAttr(s + '.translateX', rand_translate_val())
+        maya.cmds.setAttr(s + '.translateY', rand_translate_val())
+        maya.cmds.setAttr(s + '.translateZ', rand_translate_val())
+
+        maya.cmds.setAttr(s + '.rotateX', rand_rotate_val())
+        maya.cmds.setAttr(s + '.rotateY', rand_rotate_val())
+        maya.cmds.setAttr(s + '.rotateZ', rand_rotate_val())
+
+        maya.cmds.setKeyframe(s)
+
+    maya.cmds.currentTime(start_time)
+
+
+def benchmark_generation(object_count=50000, key_count=2, seed=0):
+    '''
+    Times drawing two keys of values per object with the original random.randint
+    calls and with generate_transforms(), and prints the results. Needs no Maya.
+    '''
+    looped = timeit.timeit(lambda: loop_values(object_count, 1, 120), number=1)
+    vectorized = timeit.timeit(lambda: generate_transforms(object_count, key_count, 1, 120, seed), number=1)
+
+    print('{} objects x {} keys, value generation'.format(object_count, key_count))
+    print('  random.randint loop: {:.4f}s'.format(looped))
+    print('  numpy generator:     {:.4f}s ({:.1f}x)'.format(vectorized, looped / vectorized))
+
+
+def benchmark(object_counts=(100, 1000, 10000), key_count=2, seed=0):
+    '''
+    Times keying object_counts transforms with the original loop and with both
+    writers, each in a new scene, and prints the results. Needs Maya.
+    '''
+    import maya.cmds
+
+    def make_objects(count):
+        maya.cmds.file(new=True, force=True)
+        return [maya.cmds.createNode('transform', name='bench_{}'.format(i)) for i in range(count)]
+
+    def write(writer, objects):
+        times, values = generate_transforms(len(objects), key_count, 1, 120, seed)
+        writer(objects, times, values)
+
+    for count in object_counts:
+        objects = make_objects(count)
+        looped = timeit.timeit(lambda: loop_animate(objects, 1, 120), number=1)
+
+        objects = make_objects(count)
+        with_cmds = timeit.timeit(lambda: write(apply_transforms_cmds, objects), number=1)
+
+        objects = make_objects(count)
+        with_api = timeit.timeit(lambda: write(apply_transforms, objects), number=1)
+
+        print('{} objects x {} keys'.format(count, key_count))
+        print('  currentTime/setAttr loop:   {:.4f}s'.format(looped))
+        print('  setKeyframe at time/value:  {:.4f}s ({:.1f}x)'.format(with_cmds, looped / with_cmds))
+        print('  addKeys per curve:          {:.4f}s ({:.1f}x)'.format(with_api, looped / with_api))
+
+
+if __name__ == '__main__':
+    benchmark_generation()
+
+    try:
+        import maya.standalone
+    except ImportError:
+        pass
+    else:
+        maya.standalone.initialize()
+        benchmark()
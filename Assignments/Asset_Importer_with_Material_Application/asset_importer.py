@@ -1,6 +1,12 @@
 import unreal
 import os
-from difflib import SequenceMatcher
+import hashlib
+import json
+from collections import OrderedDict
+from file_discovery import discover_files
+from material_matcher import MaterialMatchIndex
+from import_option_templates import ImportOptionTemplates
+from import_planner import create_material_to_path_dic, plan_import, predict_material
 
 '''
 run these commands in ue4 outlook to reimport script without restarting unreal
@@ -9,6 +15,9 @@ from importlib import reload
 import asset_importer
 reload(asset_importer)
 '''
+
+# name of the import manifest written next to the imported assets
+IMPORT_MANIFEST_NAME = 'import_manifest.json'
  
 def asset_data(filename='', destination='', options=None):
     ''' 
@@ -35,36 +44,63 @@ def asset_data(filename='', destination='', options=None):
     return task
 
 
-def create_directory_if_no_exist(path):
-    ''' 
-    Checks if path exist, creates it if it doesn't
+class MaterialAssetCache(object):
+    '''
+    Per-run cache of loaded material assets with least recently used eviction,
+    so each material path is checked and loaded only once while it stays cached
 
     Parameter:
-        path (string): Directory path
+        max_size (int): Largest number of material paths kept in the cache
     '''
 
-    if not directory_exists(path):
-        return unreal.EditorAssetLibrary.make_directory(directory_path=path)
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.materials = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
 
+    def get(self, materials_path):
+        '''
+        Returns the material asset at materials_path, or None if it does not exist
 
-def create_material_to_path_dic(materials_path_list):
-    '''
-    Creates a dictionary of material name keys to their corresponding path values
-    i.e: {(material name : path to material)}
+        Parameter:
+            materials_path (string): Path to the material asset
+        '''
+        if materials_path in self.materials:
+            self.hits += 1
+            self.materials.move_to_end(materials_path)
+            return self.materials[materials_path]
 
-    Parameter:
-        materials_path_list (list of strings): List containing all of the paths to material assets
+        self.misses += 1
+
+        # missing materials are cached too, so they are only checked once
+        mat = None
+        if unreal.EditorAssetLibrary.does_asset_exist(materials_path):
+            mat = unreal.EditorAssetLibrary.load_asset(materials_path)
+            self.loads += 1
+
+        self.materials[materials_path] = mat
+        if len(self.materials) > self.max_size:
+            self.materials.popitem(last=False)
+
+        return mat
+
+    def stats(self):
+        ''' Returns the cache hits, misses, and loads '''
+        return {'hits': self.hits, 'misses': self.misses, 'loads': self.loads}
 
-    Returns:
-        Dictionary of material names to paths
-    '''
-    result = dict()
 
-    for m in materials_path_list:
-        mat_name = m.split('/')[-1]
-        result.update([(mat_name, m)])
+def create_directory_if_no_exist(path):
+    ''' 
+    Checks if path exist, creates it if it doesn't
+
+    Parameter:
+        path (string): Directory path
+    '''
 
-    return result
+    if not directory_exists(path):
+        return unreal.EditorAssetLibrary.make_directory(directory_path=path)
 
 
 def directory_exists(path):
@@ -97,42 +133,206 @@ def execute_import_tasks_and_get_import_paths(tasks=[]):
     return imported_asset_paths
 
 
-def get_fbx_from_folder(folder_path):
+def get_fbx_from_folder(folder_path, recursive=False):
     ''' 
     Creates a list of fbx file paths from the given folder_path 
 
     Parameter:
         folder_path (string): path to folder containing the fbx files 
+        recursive (bool): True to also look in the sub folders of folder_path
 
     Returns:
         a list of fbx files in folder_path
     '''
 
-    fbx_files = [os.path.join(folder_path, f) for f in os.listdir(
-        folder_path) if (os.path.exists(os.path.join(folder_path, f)) and f.endswith('.fbx'))]
+    fbx_files = list(discover_files(folder_path, include=['*.fbx'], recursive=recursive))
 
     return fbx_files
 
 
-def replace_meshes(asset_path_list, matName_to_path, set_to_closest_mat):
+def hash_file(file_path):
+    '''
+    Returns the sha1 hex digest of the contents of file_path
+
+    Parameter:
+        file_path (string): Path of the file to hash
+    '''
+
+    sha = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def mount_point_content_dir(mount_point):
+    '''
+    Returns the folder on disk holding the content of a mount point, or None if it
+    cannot be found: the project's Content folder for Game, the engine's for Engine,
+    and the Content folder next to the .uplugin file for a plugin
+
+    Parameter:
+        mount_point (string): Root of a content path, i.e: Game for /Game/Props
+    '''
+
+    if(mount_point == 'Game'):
+        return unreal.Paths.project_content_dir()
+    if(mount_point == 'Engine'):
+        return unreal.Paths.engine_content_dir()
+
+    plugin_file = mount_point + '.uplugin'
+    for plugins_dir in [unreal.Paths.project_plugins_dir(), unreal.Paths.engine_plugins_dir()]:
+        for root, dirs, files in os.walk(unreal.Paths.convert_relative_path_to_full(plugins_dir)):
+            if(plugin_file in files):
+                return os.path.join(root, 'Content')
+
+    return None
+
+
+def import_manifest_path(save_dir_path):
+    '''
+    Returns the file path of the import manifest for save_dir_path, in the folder
+    on disk that holds the assets imported there. Content paths whose mount point
+    has no folder on disk keep their manifest under the project's Saved folder.
+
+    Parameter:
+        save_dir_path (string): Content path the assets are imported to, i.e: /Game/Props
+            or /MyPlugin/Props
+    '''
+
+    parts = save_dir_path.strip('/').split('/')
+    content_dir = mount_point_content_dir(parts[0])
+
+    if(content_dir is None):
+        content_dir = os.path.join(unreal.Paths.project_saved_dir(), 'ImportManifests', parts[0])
+
+    # drop the mount point, i.e: Game
+    relative_path = os.path.join(*parts[1:]) if len(parts) > 1 else ''
+
+    return os.path.join(unreal.Paths.convert_relative_path_to_full(content_dir), relative_path, IMPORT_MANIFEST_NAME)
+
+
+def load_import_manifest(manifest_path):
+    '''
+    Returns the import manifest at manifest_path, mapping each fbx path to its hash,
+    size, modification time, import settings and imported asset paths. Returns an empty
+    manifest if there is none yet or if it cannot be read
+
+    Parameter:
+        manifest_path (string): Path of the manifest file
+    '''
+
+    if not os.path.exists(manifest_path):
+        return dict()
+
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    except ValueError:
+        unreal.log_warning('Ignoring unreadable import manifest: {}'.format(manifest_path))
+        return dict()
+
+
+def save_import_manifest(manifest_path, manifest):
+    '''
+    Writes the import manifest to manifest_path. It is written to a temporary file
+    first so an interrupted import never leaves it half written
+
+    Parameters:
+        manifest_path (string): Path of the manifest file
+        manifest (dictionary): fbx paths mapped to their manifest entries
+    '''
+
+    manifest_dir = os.path.dirname(manifest_path)
+    if not os.path.isdir(manifest_dir):
+        os.makedirs(manifest_dir)
+
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    os.rename(temp_path, manifest_path)
+
+
+def manifest_entry(fbx_path, settings, asset_paths):
+    '''
+    Returns the manifest entry recording that fbx_path was imported with settings into asset_paths
+
+    Parameters:
+        fbx_path (string): Path of the imported fbx file
+        settings (dictionary): Import settings that change the imported assets
+        asset_paths (list of strings): Paths of the assets imported from fbx_path
+    '''
+
+    stat = os.stat(fbx_path)
+    return {'hash': hash_file(fbx_path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'settings': settings,
+            'assets': [str(p) for p in asset_paths]}
+
+
+def is_unchanged(fbx_path, entry, settings):
+    '''
+    Returns True if fbx_path was already imported with the same settings, its contents
+    have not changed since, and every asset imported from it still exists
+
+    The file is only hashed if its size or modification time changed. If the contents
+    turn out to be the same, the entry's modification time is updated
+
+    Parameters:
+        fbx_path (string): Path of the fbx file
+        entry (dictionary): Manifest entry of fbx_path, or None
+        settings (dictionary): Import settings of this run
+    '''
+
+    if not entry or entry.get('settings') != settings or not entry.get('assets'):
+        return False
+
+    for asset_path in entry['assets']:
+        if not unreal.EditorAssetLibrary.does_asset_exist(asset_path):
+            return False
+
+    stat = os.stat(fbx_path)
+    if stat.st_size == entry['size'] and stat.st_mtime == entry['mtime']:
+        return True
+
+    if stat.st_size == entry['size'] and hash_file(fbx_path) == entry['hash']:
+        entry['mtime'] = stat.st_mtime
+        return True
+
+    return False
+
+
+def replace_meshes(asset_path_list, matName_to_path, set_to_closest_mat, match_index=None, material_cache=None,
+                   planned_materials=None):
     '''
     Goes through asset_path_list to grab each asset's material slots and replaces them with 
     existing materials that match the slot names. 
 
     If a slot name does not match any existing mateials
         - If set_to_closest_mat is True, the program will find the closest-named material above a
-            0.6 threshhold and set it to that slot
+            0.6 threshhold and set it to that slot. Equal scores go to the first name alphabetically
         - If set_to_closest_mat is False, then the material slot won't be changed
 
     Parameters:
         asset_path_list (list of strings): List of paths to assets
         matName_to_path (dictorionary): Dictionary mapping material names to their corresponding location in the project
         set_to_closest_mat (bool): True if we want to match nonexisting materials to their closest match, False otherwise 
+        match_index (MaterialMatchIndex): Index of the material names, built from matName_to_path if not given
+        material_cache (MaterialAssetCache): Cache of loaded materials, a new one is used if not given
+        planned_materials (dictionary): Slot names mapped to the material paths an import plan
+            predicted for them (see import_planner), these slots are not matched again
     '''
 
-    if(set_to_closest_mat):
-        # get a list of material names from the matName_to_path dictionary
-        mat_names = matName_to_path.keys()
+    if material_cache is None:
+        material_cache = MaterialAssetCache()
+
+    if(set_to_closest_mat and match_index is None):
+        # index the material names once, slot matches are memoized across meshes
+        match_index = MaterialMatchIndex(matName_to_path.keys())
 
     for asset_path in asset_path_list:
         
@@ -145,35 +345,20 @@ def replace_meshes(asset_path_list, matName_to_path, set_to_closest_mat):
         index = 0
 
         for m in material_data:
-            materials_path = None
-            slot_name = m.material_slot_name
-
-            if(set_to_closest_mat == True):
-                # initialize dictionary
-                score_to_name = dict()
-
-                # create the dictionary with score keys and material name values
-                # { score : name, ... , score : name }
-                for n in mat_names:
-                    score = SequenceMatcher(None, str(slot_name), n).ratio()
-                    score_to_name.update([(score, n)])
-
-                best_score = max(sorted(score_to_name))
-                
-                # if the best score is similar enough, get its associated 
-                # material name and path
-                if(best_score > 0.6):
-                    mat = score_to_name.get(best_score)
-                    materials_path = matName_to_path.get(mat)
+            slot_name = str(m.material_slot_name)
+
+            if(planned_materials is not None and slot_name in planned_materials):
+                materials_path = planned_materials[slot_name]
 
             else:
-                # find path of material matching slot name
+                # closest-named material above the threshold if set_to_closest_mat,
+                # otherwise the material matching the slot name
                 # if there is no match, material_path will be set to None
-                materials_path = matName_to_path.get(str(slot_name))
+                materials_path = predict_material(slot_name, matName_to_path, set_to_closest_mat, match_index)
 
-            if (materials_path is not None) and unreal.EditorAssetLibrary.does_asset_exist(materials_path):
-                # load material asset and set it to mesh
-                mat = unreal.EditorAssetLibrary.load_asset(materials_path)
+            # load material asset (once per run) and set it to mesh
+            mat = material_cache.get(materials_path) if materials_path is not None else None
+            if mat is not None:
                 asset.set_material(index, mat)
 
             index += 1
@@ -219,7 +404,48 @@ def static_mesh_import_options(import_materials_and_textures):
 '''
 
 
-def import_assets(fbx_directory, save_directory, materials_path_list, set_to_closest_mat, import_materials_and_textures):
+def execute_import_plan(plan, options_override=None):
+    '''
+    Imports the assets of an import plan and replaces their materials
+
+    Parameters:
+        plan (dictionary): Plan built by import_planner.plan_import()
+        options_override (function): Optional hook called as options_override(fbx_path, template_options)
+            that can return different import options for a file, or None to use the shared ones
+
+    Returns:
+        The list of import tasks that were run
+    '''
+
+    assets = []
+
+    # import options are built once per combination of settings and shared by every asset
+    templates = ImportOptionTemplates()
+
+    # with the planned files, create a list of necessary data to import each asset
+    planned_materials = dict()
+    for t in plan['tasks']:
+        options = templates.options_for(t['filename'], t['kind'], static_mesh_import_options, options_override,
+                                        **t['settings'])
+        assets.append(asset_data(t['filename'], t['destination'], options))
+        planned_materials.update(t['materials'])
+
+    # import the assets and get a list of their paths in the project
+    imported_asset_paths = execute_import_tasks_and_get_import_paths(assets)
+
+    # replace the newly imported asset materials with already existing ones
+    matName_to_path = create_material_to_path_dic(plan['materials_path_list'])
+    material_cache = MaterialAssetCache()
+    replace_meshes(imported_asset_paths, matName_to_path, plan['set_to_closest_mat'],
+                   material_cache=material_cache, planned_materials=planned_materials)
+
+    unreal.log('Material cache: {hits} hits, {misses} misses, {loads} loads'.format(**material_cache.stats()))
+
+    return assets
+
+
+def import_assets(fbx_directory, save_directory, materials_path_list, set_to_closest_mat, import_materials_and_textures,
+                  options_override=None, prescan=False, use_cache=True):
     '''
     This function is the main driver for importing the assets and setting the materials
 
@@ -229,29 +455,66 @@ def import_assets(fbx_directory, save_directory, materials_path_list, set_to_clo
         materials_path_list (list of strings): List of all the paths to every material in form /path/material_name
         set_to_closest_mat (bool): True if we want to match nonexisting materials to their closest match, False otherwise
         import_materials_and_textures (bool): True if we want to import the materials/textures from the assets, False otherwise 
+        options_override (function): Optional hook called as options_override(fbx_path, template_options)
+            that can return different import options for a file, or None to use the shared ones
+        prescan (bool): True to read the fbx files outside the editor first (see fbx_prescan), skip
+            the ones that are not static meshes, and match their material names before importing
+        use_cache (bool): True to skip fbx files that were already imported unchanged with the same
+            settings, as recorded in the import manifest next to the imported assets
     '''
 
-    assets = []
-
     # Must get paths (in string form) from directory objects
-    fbx_dir_path = fbx_directory.path
-    save_dir_path = save_directory.path
+    run_import(fbx_directory.path, save_directory.path, materials_path_list, set_to_closest_mat,
+               import_materials_and_textures, options_override, prescan, use_cache)
+
+
+def run_import(fbx_dir_path, save_dir_path, materials_path_list, set_to_closest_mat, import_materials_and_textures,
+               options_override=None, prescan=False, use_cache=True, recursive=False):
+    '''
+    Plans and runs an import: creates the destination directory, skips the files the
+    import manifest records as unchanged, imports the rest, replaces their materials
+    and updates the manifest. import_assets() and the import_planner command line
+    both import through this.
+
+    Parameters:
+        fbx_dir_path (string): Folder containing the fbx files
+        save_dir_path (string): Content path the assets are imported to
+        recursive (bool): True to also import the fbx files in the sub folders of fbx_dir_path
+        The other parameters are the same as import_assets()
 
-    # create the dictionary of materials to paths
-    matName_to_path = create_material_to_path_dic(materials_path_list)
+    Returns:
+        The plan that was run, see import_planner.plan_import()
+    '''
 
     # creates the directory if it doesnt yet exist
     create_directory_if_no_exist(save_dir_path)
 
-    # get all fbx files from fbx_directory
-    fbx_paths = get_fbx_from_folder(fbx_dir_path)
+    # only the files that are new or changed since the last import are imported
+    settings = {'import_materials_and_textures': import_materials_and_textures}
+    manifest_path = import_manifest_path(save_dir_path)
+    manifest = load_import_manifest(manifest_path)
 
-    # with these fbx files, create a list of necessary data to import each asset
-    for f in fbx_paths:
-        assets.append(asset_data(f, save_dir_path, static_mesh_import_options(import_materials_and_textures)))
-    
-    # import the assets and get a list of their paths in the project
-    imported_asset_paths = execute_import_tasks_and_get_import_paths(assets)
-    
-    # replace the newly imported asset materials with already existing ones
-    replace_meshes(imported_asset_paths, matName_to_path, set_to_closest_mat)
+    skip = None
+    if(use_cache):
+        skip = lambda f: is_unchanged(f, manifest.get(f), settings)
+
+    # decide what to import, see import_planner
+    plan = plan_import(fbx_dir_path, save_dir_path, materials_path_list, set_to_closest_mat,
+                       import_materials_and_textures, prescan=prescan, recursive=recursive, skip=skip)
+
+    for skipped in plan['skipped']:
+        if(skipped['reason'] != 'unchanged'):
+            unreal.log_warning('Skipping {}: {}'.format(skipped['path'], skipped['reason']))
+    unreal.log('Importing {} fbx files, skipping {}'.format(len(plan['tasks']), len(plan['skipped'])))
+
+    assets = execute_import_plan(plan, options_override) if plan['tasks'] else []
+
+    # record what each file imported, once its materials are replaced
+    # (also keeps the modification times of files that were touched but not changed)
+    for task in assets:
+        fbx_path = task.get_editor_property('filename')
+        manifest[fbx_path] = manifest_entry(fbx_path, settings, task.get_editor_property('imported_object_paths'))
+
+    save_import_manifest(manifest_path, manifest)
+
+    return plan
@@ -0,0 +1,192 @@
+'''
+Offline planning for asset_importer.
+
+plan_import() does everything import_assets() needs to decide before
+touching the editor: finding the fbx files, skipping cached or
+non-static-mesh files, the material name dictionary, the import settings
+of each task and, when the files are pre-scanned, the material each slot
+will be given. The plan is a plain dictionary that can be written as
+JSON. asset_importer.execute_import_plan() runs it in the editor.
+
+This module does not import unreal. To time the planning stages on a
+folder and write the plan without an editor:
+
+python import_planner.py path/to/fbx_folder /Game/Props --materials materials.txt --prescan --dry-run
+
+Without --dry-run the files are imported the same way import_assets() imports
+them (see asset_importer.run_import), which must be done inside Unreal.
+'''
+
+import argparse
+import json
+import sys
+import timeit
+
+from file_discovery import discover_files
+from fbx_prescan import route_files
+from material_matcher import MaterialMatchIndex
+
+
+def create_material_to_path_dic(materials_path_list):
+    '''
+    Creates a dictionary of material name keys to their corresponding path values
+    i.e: {(material name : path to material)}
+
+        Parameter:
+            materials_path_list (list of strings): List containing all of the paths to material assets
+
+        Returns:
+            Dictionary of material names to paths
+    '''
+    result = dict()
+
+    for m in materials_path_list:
+        mat_name = m.split('/')[-1]
+        result.update([(mat_name, m)])
+
+    return result
+
+
+def predict_material(slot_name, matName_to_path, set_to_closest_mat, match_index=None):
+    '''
+    Returns the path of the material a slot named slot_name will be given, or None
+    if the slot will be left unchanged. replace_meshes() assigns materials with this.
+
+        Parameters:
+            slot_name (string): Material slot name
+            matName_to_path (dictionary): Material names mapped to their paths
+            set_to_closest_mat (bool): True to use the closest-named material above a 0.6 threshold
+            match_index (MaterialMatchIndex): Index of the material names, needed if set_to_closest_mat
+    '''
+    if set_to_closest_mat:
+        mat = match_index.best_match(slot_name, 0.6)
+        return matName_to_path.get(mat) if mat is not None else None
+
+    return matName_to_path.get(slot_name)
+
+
+def plan_import(fbx_dir_path, save_dir_path, materials_path_list, set_to_closest_mat,
+                import_materials_and_textures, prescan=False, recursive=False, skip=None, processes=None):
+    '''
+    Builds the plan for importing the fbx files in fbx_dir_path
+
+        Parameters:
+            fbx_dir_path (string): Folder containing the fbx files
+            save_dir_path (string): Content path the assets are imported to
+            materials_path_list (list of strings): Paths to every material in form /path/material_name
+            set_to_closest_mat (bool): True to match slots to their closest-named material
+            import_materials_and_textures (bool): True to import the materials/textures of the assets
+            prescan (bool): True to pre-scan the files (see fbx_prescan), plan only the static meshes
+                and predict the material of each of their slots
+            recursive (bool): True to also look in the sub folders of fbx_dir_path
+            skip (function): Optional skip(fbx_path) that returns True for files that need no import
+            processes (int): Number of pre-scan worker processes, see fbx_prescan.scan_files()
+
+        Returns:
+            A dictionary with the import settings, one task per file to import (its filename,
+            destination, option settings and, when pre-scanned, slot name -> material path),
+            the skipped files with the reason, and the time spent in each planning stage
+    '''
+    timings = dict()
+    skipped = []
+
+    start = timeit.default_timer()
+    fbx_paths = list(discover_files(fbx_dir_path, include=['*.fbx'], recursive=recursive))
+    timings['discover'] = timeit.default_timer() - start
+
+    if skip is not None:
+        start = timeit.default_timer()
+        unchanged = set(f for f in fbx_paths if skip(f))
+        skipped.extend({'path': f, 'reason': 'unchanged'} for f in fbx_paths if f in unchanged)
+        fbx_paths = [f for f in fbx_paths if f not in unchanged]
+        timings['skip'] = timeit.default_timer() - start
+
+    scans = dict()
+    if prescan:
+        start = timeit.default_timer()
+        static_meshes, others = route_files(fbx_paths, ['static_mesh'], processes)
+        skipped.extend({'path': r['path'], 'reason': r['error'] or r['kind']} for r in others)
+        scans = dict((r['path'], r) for r in static_meshes)
+        fbx_paths = [r['path'] for r in static_meshes]
+        timings['prescan'] = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    matName_to_path = create_material_to_path_dic(materials_path_list)
+    match_index = MaterialMatchIndex(matName_to_path.keys()) if set_to_closest_mat else None
+
+    tasks = []
+    for f in fbx_paths:
+        materials = dict()
+        for slot_name in scans.get(f, {}).get('materials', ()):
+            materials[slot_name] = predict_material(slot_name, matName_to_path, set_to_closest_mat, match_index)
+
+        tasks.append({'filename': f,
+                      'destination': save_dir_path,
+                      'kind': 'static_mesh',
+                      'settings': {'import_materials_and_textures': import_materials_and_textures},
+                      'materials': materials})
+    timings['materials'] = timeit.default_timer() - start
+
+    return {'fbx_directory': fbx_dir_path,
+            'save_directory': save_dir_path,
+            'materials_path_list': list(materials_path_list),
+            'set_to_closest_mat': set_to_closest_mat,
+            'tasks': tasks,
+            'skipped': skipped,
+            'timings': timings}
+
+
+def save_plan(plan, plan_path):
+    ''' Writes plan to plan_path as JSON '''
+    with open(plan_path, 'w') as f:
+        json.dump(plan, f, indent=2, sort_keys=True)
+
+
+def load_plan(plan_path):
+    ''' Returns the plan stored in the JSON file at plan_path '''
+    with open(plan_path, 'r') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Plan (and run) an asset import')
+    parser.add_argument('fbx_directory')
+    parser.add_argument('save_directory')
+    parser.add_argument('--materials', help='text file with one material path per line')
+    parser.add_argument('--closest', action='store_true', help='match slots to their closest-named material')
+    parser.add_argument('--import-materials', action='store_true', help='import the materials/textures of the assets')
+    parser.add_argument('--prescan', action='store_true', help='pre-scan the fbx files')
+    parser.add_argument('--recursive', action='store_true')
+    parser.add_argument('--dry-run', action='store_true', help='write the plan as JSON instead of importing')
+    parser.add_argument('--output', help='file the dry-run plan is written to, stdout by default')
+    args = parser.parse_args(argv)
+
+    materials_path_list = []
+    if args.materials:
+        with open(args.materials, 'r') as f:
+            materials_path_list = [line.strip() for line in f if line.strip()]
+
+    if args.dry_run:
+        plan = plan_import(args.fbx_directory, args.save_directory, materials_path_list, args.closest,
+                           args.import_materials, prescan=args.prescan, recursive=args.recursive)
+    else:
+        # create the destination, skip unchanged files and update the manifest, as in the editor
+        from asset_importer import run_import
+        plan = run_import(args.fbx_directory, args.save_directory, materials_path_list, args.closest,
+                          args.import_materials, prescan=args.prescan, recursive=args.recursive)
+
+    for stage, seconds in sorted(plan['timings'].items()):
+        sys.stderr.write('{:<12}{:>10.3f}s\n'.format(stage, seconds))
+    sys.stderr.write('{} tasks, {} skipped\n'.format(len(plan['tasks']), len(plan['skipped'])))
+
+    if not args.dry_run:
+        return
+
+    if args.output:
+        save_plan(plan, args.output)
+    else:
+        json.dump(plan, sys.stdout, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
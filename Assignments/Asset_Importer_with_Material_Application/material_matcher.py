@@ -0,0 +1,173 @@
+'''
+Fuzzy matching of material slot names to material names.
+
+MaterialMatchIndex is built once per import run from every material name
+in the project. For each slot name it narrows the library down to the
+names that share the most character trigrams with it, and only scores
+those with difflib.SequenceMatcher (the same score replace_meshes()
+always used). Results are returned best score first, ties broken by
+name, and are memoized so a slot name shared by many meshes is only
+matched once.
+
+This module is pure Python. To compare it against scoring every name:
+
+python material_matcher.py
+'''
+
+import random
+import string
+import timeit
+from difflib import SequenceMatcher
+
+
+def trigrams(name):
+    ''' Returns the set of lower case character trigrams of name, padded with spaces '''
+    padded = '  {} '.format(name.lower())
+    return set(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class MaterialMatchIndex(object):
+    '''
+    Trigram index over material names
+
+        Parameters:
+            names (list of strings): Every material name that slots can be matched to
+            candidates (int): Number of names, by shared trigrams, scored per query
+    '''
+
+    def __init__(self, names, candidates=50):
+        self.names = sorted(set(names))
+        self.name_set = set(self.names)
+        self.candidates = candidates
+        self.memo = dict()
+
+        # trigram -> list of indices into self.names
+        self.postings = dict()
+        for i, n in enumerate(self.names):
+            for t in trigrams(n):
+                self.postings.setdefault(t, []).append(i)
+
+    def shortlist(self, query):
+        ''' Returns the names sharing the most trigrams with query '''
+        if len(self.names) <= self.candidates:
+            return self.names
+
+        shared = dict()
+        for t in trigrams(query):
+            for i in self.postings.get(t, ()):
+                shared[i] = shared.get(i, 0) + 1
+
+        best = sorted(shared.items(), key=lambda item: (-item[1], item[0]))[:self.candidates]
+        return [self.names[i] for i, _ in best]
+
+    def top_k(self, query, k=5):
+        '''
+        Returns up to k (score, name) pairs for query, best score first and
+        ties broken by name
+
+            Parameters:
+                query (string): Material slot name
+                k (int): Number of matches to return
+        '''
+        key = (query, k)
+        if key in self.memo:
+            return self.memo[key]
+
+        matcher = SequenceMatcher(None, query)
+        scored = []
+
+        for n in self.shortlist(query):
+            # same score as SequenceMatcher(None, query, n).ratio()
+            matcher.set_seq2(n)
+
+            # skip names whose upper bound cannot beat the current k-th best
+            if len(scored) >= k:
+                worst = -scored[k - 1][0]
+                if matcher.real_quick_ratio() < worst or matcher.quick_ratio() < worst:
+                    continue
+
+            scored.append((-matcher.ratio(), n))
+            scored.sort()
+            del scored[k:]
+
+        result = [(-score, n) for score, n in scored]
+        self.memo[key] = result
+        return result
+
+    def best_match(self, query, threshold=0.6):
+        '''
+        Returns the material name that best matches query if its score is
+        above threshold, None otherwise
+        '''
+        if query in self.name_set:
+            return query
+
+        matches = self.top_k(query, 1)
+        if matches and matches[0][0] > threshold:
+            return matches[0][1]
+
+        return None
+
+
+###############  Benchmark  ###############
+
+
+def make_names(count, seed=0):
+    ''' Returns count synthetic material names such as M_Metal_Rough_012 '''
+    rng = random.Random(seed)
+    words = ['Metal', 'Wood', 'Plastic', 'Glass', 'Rubber', 'Fabric', 'Stone', 'Brick',
+             'Concrete', 'Leather', 'Paint', 'Rust', 'Dirt', 'Rough', 'Glossy', 'Dark',
+             'Light', 'Worn', 'Clean', 'Painted', 'Chrome', 'Gold', 'Copper', 'Tile']
+    names = set()
+    while len(names) < count:
+        parts = rng.sample(words, rng.randint(1, 3))
+        names.add('M_{}_{:03d}'.format('_'.join(parts), rng.randint(0, 999)))
+    return sorted(names)
+
+
+def brute_force_best(query, names):
+    ''' Scores every name against query, like replace_meshes() used to '''
+    best = max((SequenceMatcher(None, query, n).ratio(), n) for n in names)
+    return best[1] if best[0] > 0.6 else None
+
+
+def benchmark(materials=5000, slots=50, seed=1):
+    '''
+    Times matching `slots` slot names against `materials` material names by
+    scoring every name and with the trigram index, and prints the results
+    '''
+    rng = random.Random(seed)
+    names = make_names(materials)
+
+    # slot names are library names with a couple of typos
+    queries = []
+    for _ in range(slots):
+        q = list(rng.choice(names))
+        for _ in range(2):
+            q[rng.randrange(len(q))] = rng.choice(string.ascii_letters)
+        queries.append(''.join(q))
+
+    brute = []
+    brute_seconds = timeit.timeit(lambda: brute.extend(brute_force_best(q, names) for q in queries), number=1)
+
+    def run_index():
+        index = MaterialMatchIndex(names)
+        indexed.extend(index.best_match(q) for q in queries)
+
+    indexed = []
+    index_seconds = timeit.timeit(run_index, number=1)
+
+    # equal scores can pick different names, so compare the scores
+    def score(q, n):
+        return SequenceMatcher(None, q, n).ratio() if n else 0.0
+
+    agree = sum(1 for q, a, b in zip(queries, brute, indexed) if score(q, a) == score(q, b))
+
+    print('{} slots x {} materials'.format(slots, materials))
+    print('  score every name: {:.3f}s'.format(brute_seconds))
+    print('  trigram index:    {:.3f}s ({:.1f}x), same match for {}/{} slots'.format(
+        index_seconds, brute_seconds / index_seconds, agree, slots))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -6,6 +6,9 @@ This script bakes an animation onto a given skeleton rig.
 To run, input the paths (directory including file name) of 
 the animation and rig as well as the path to where you want
 the new scene to be saved. Then execute the code in Maya.
+
+To reduce keys after baking, also add key_reduction from
+Assignments/Shared to your Maya scripts.
 '''
 
 import maya.cmds
@@ -71,6 +74,121 @@ def connect_joints(src_joints_list, dst_joints_list, dst_ns):
             maya.cmds.parentConstraint(s, dst_joint, mo=True)
 
 
+# Pose attributes that must be equal on both skeletons for the direct curve
+# transfer to give the same result as the constraint bake with mo=True
+POSE_ATTRIBUTES = ['translate', 'rotate', 'jointOrient']
+
+# Channels driven by the parentConstraint, their value is copied by the
+# direct curve transfer when they have no curve
+TRANSFER_ATTRIBUTES = ['translateX', 'translateY', 'translateZ',
+                       'rotateX', 'rotateY', 'rotateZ']
+
+
+def hierarchies_match(src_joints_list, dst_joints_list, dst_ns, tolerance=1e-4):
+    '''
+    Returns True if every source joint has a destination joint of the same
+    name, with a parent of the same name, the same rotate order and, at the
+    current time, the same translate, rotate and joint orient. The constraint
+    bake creates its constraints with mo=True at the current time, keeping
+    any difference between the poses as an offset. Only when there is none
+    can the source curves be copied straight onto the destination joints and
+    give the same result as a constraint bake.
+
+    Only the pose at the current frame is compared. The skeletons are not
+    checked at any other frame of the animation.
+
+        Parameters: 
+            src_joints_list (list of strings): A list of joint names from our source file
+            dst_joints_list (list of strings): A list of joint names from our destination file
+            dst_ns (string): The name of our destination namespace
+            tolerance (float): Largest translate, rotate or joint orient difference treated as equal
+    '''
+
+    dst_joints = set(dst_joints_list)
+    short_name = lambda j: j.split('|')[-1].split(':')[-1]
+
+    for s in src_joints_list:
+        dst_joint = '{}:{}'.format(dst_ns, short_name(s))
+
+        if dst_joint not in dst_joints:
+            return False
+
+        src_parent = maya.cmds.listRelatives(s, parent=True) or ['']
+        dst_parent = maya.cmds.listRelatives(dst_joint, parent=True) or ['']
+        if short_name(src_parent[0]) != short_name(dst_parent[0]):
+            return False
+
+        if maya.cmds.getAttr(s + '.rotateOrder') != maya.cmds.getAttr(dst_joint + '.rotateOrder'):
+            return False
+
+        for attr in POSE_ATTRIBUTES:
+            src_values = maya.cmds.getAttr('{}.{}'.format(s, attr))[0]
+            dst_values = maya.cmds.getAttr('{}.{}'.format(dst_joint, attr))[0]
+            if any(abs(a - b) > tolerance for a, b in zip(src_values, dst_values)):
+                return False
+
+    return True
+
+
+def transfer_curves(src_joints_list, dst_ns, start_time, end_time):
+    '''
+    Copies the animation curves of every keyed attribute of every source joint
+    straight onto the destination joint of the same name, one copyKey and
+    pasteKey batch per joint, as constraint_bake bakes every keyable channel.
+    Translate and rotate channels without curves have their value copied.
+    No constraints are created and the scene is never evaluated per frame.
+
+        Parameters: 
+            src_joints_list (list of strings): A list of joint names from our source file
+            dst_ns (string): The name of our destination namespace
+            start_time (float): First frame to transfer
+            end_time (float): Last frame to transfer
+    '''
+
+    for s in src_joints_list:
+        dst_joint = '{}:{}'.format(dst_ns, s.split('|')[-1].split(':')[-1])
+
+        # every keyed attribute the destination joint also has
+        animated_attrs = [a for a in maya.cmds.listAttr(s, keyable=True) or []
+                          if maya.cmds.keyframe('{}.{}'.format(s, a), q=True, keyframeCount=True)
+                          and maya.cmds.objExists('{}.{}'.format(dst_joint, a))]
+
+        # copy every animated channel of the joint in one batch, keys stay on their frames
+        if animated_attrs:
+            maya.cmds.copyKey(s, attribute=animated_attrs, time=(start_time, end_time))
+            maya.cmds.pasteKey(dst_joint, attribute=animated_attrs, time=(start_time, end_time),
+                               timeOffset=0, option='replaceCompletely')
+
+        for a in TRANSFER_ATTRIBUTES:
+            if a not in animated_attrs:
+                maya.cmds.setAttr('{}.{}'.format(dst_joint, a), maya.cmds.getAttr('{}.{}'.format(s, a)))
+
+
+def constraint_bake(anim_joints, rig_joints, rig_ns, start_time, end_time):
+    '''
+    Constrains rig_joints to anim_joints and bakes the result onto rig_joints
+    over start_time to end_time
+    '''
+    # Connect joints from skeleton to animation
+    connect_joints(anim_joints, rig_joints, rig_ns)
+
+    # Shake 'n Bake animation bones onto character bones
+    maya.cmds.select(cl=True)
+    maya.cmds.select(rig_joints)
+    maya.cmds.bakeResults(simulation = True,
+                        time = (start_time, end_time),
+                        sampleBy = 1,
+                        oversamplingRate= 1,
+                        disableImplicitControl = True,
+                        preserveOutsideKeys = True,
+                        sparseAnimCurveBake = False,
+                        removeBakedAnimFromLayer = False,
+                        bakeOnOverrideLayer = False,
+                        minimizeRotation = True,
+                        controlPoints = False,
+                        shape = True)
+
+
 def save_file(file_path):
     ''' Saves the current scene at the location of file_path'''
     maya.cmds.file(rename = file_path)
@@ -80,7 +198,19 @@ def save_file(file_path):
 ##############  End of Helper Functions  ###############
 
 
-def batch_animation(rig_path, anim_path, new_file_path):
+def batch_animation(rig_path, anim_path, new_file_path, direct_transfer=False, reduce_keys=False):
+    '''
+    Bakes the animation in anim_path onto the rig in rig_path and saves
+    the result to new_file_path.
+
+    If direct_transfer is True and the animation and rig hierarchies match
+    (including the pose of every joint on the first frame, see hierarchies_match),
+    the animation curves are copied straight onto the rig joints instead of
+    constraining the rig and baking it. Otherwise the constraint bake is used.
+
+    If reduce_keys is True, keys that can be rebuilt by interpolation are
+    removed from the baked curves (see key_reduction, requires NumPy).
+    '''
     # Create new scene
     maya.cmds.file(new=True, force=True)
 
@@ -103,28 +233,24 @@ def batch_animation(rig_path, anim_path, new_file_path):
     maya.cmds.playbackOptions(animationStartTime=first_keyframe, minTime=first_keyframe)
     maya.cmds.currentTime(first_keyframe)
 
-    # Connect joints from skeleton to animation
-    connect_joints(anim_joints, rig_joints, rig_ns)
-
-    # Shake 'n Bake animation bones onto character bones
     start_time = maya.cmds.playbackOptions(q=True, min=True)
-    end_time = maya.cmds.playbackOptions(q=True, max=True)   
-    
-    maya.cmds.select(cl=True)
-    maya.cmds.select(rig_joints)
-    maya.cmds.bakeResults(simulation = True,
-                        time = (start_time, end_time),
-                        sampleBy = 1,
-                        oversamplingRate= 1,
-                        disableImplicitControl = True,
-                        preserveOutsideKeys = True,
-                        sparseAnimCurveBake = False,
-                        removeBakedAnimFromLayer = False,
-                        bakeOnOverrideLayer = False,
-                        minimizeRotation = True,
-                        controlPoints = False,
-                        shape = True)
-    
+    end_time = maya.cmds.playbackOptions(q=True, max=True)
+
+    if direct_transfer and hierarchies_match(anim_joints, rig_joints, rig_ns):
+        # Copy animation curves straight onto character bones
+        transfer_curves(anim_joints, rig_ns, start_time, end_time)
+
+    else:
+        if direct_transfer:
+            maya.cmds.warning('Hierarchies do not match, falling back to constraint bake')
+
+        constraint_bake(anim_joints, rig_joints, rig_ns, start_time, end_time)
+
+    # Simplify the baked curves
+    if reduce_keys:
+        from key_reduction import reduce_baked_keys
+        reduce_baked_keys(rig_joints)
+
     # Remove animation reference
     maya.cmds.file(anim_path, rr=True)
 
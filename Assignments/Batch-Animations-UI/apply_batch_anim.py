@@ -1,15 +1,21 @@
 '''
 Krysten Tachiyama
 
-Make sure to add this file to your Maya scripts folder so Maya can find it.
+Make sure to add this file, bake_telemetry and, from Assignments/Shared,
+file_discovery and key_reduction to your Maya scripts folder so Maya can
+find them.
 
 This script bakes an animation onto a given skeleton rig.
 To run, call batch_animations() with the appropriate arguments.
 '''
 
 import maya.cmds
+import maya.mel
 import os
 
+from bake_telemetry import BakeRecord, bake_record
+from file_discovery import discover_files
+
 
 ###############  Helper Functions  ###############
 
@@ -71,81 +77,427 @@ def connect_joints(src_joints_list, dst_joints_list, dst_ns):
             maya.cmds.parentConstraint(s, dst_joint, mo=True)
 
 
+def get_bake_range(joints, handles=0):
+    '''
+    Returns the (start, end) frames spanning every key on every animated
+    channel of joints, found with one query for the first key and one for
+    the last key across all of their curves.
+
+        Parameters:
+            joints (list of strings): Joints whose animation is being baked
+            handles (int): Extra frames to add before the start and after the end
+    '''
+    start_time = maya.cmds.findKeyframe(joints, which='first')
+    end_time = maya.cmds.findKeyframe(joints, which='last')
+
+    return start_time - handles, end_time + handles
+
+
 def save_file(file_path):
     ''' Saves the current scene at the location of file_path'''
     maya.cmds.file(rename=file_path)
     maya.cmds.file(save=True, f=True)
 
 
+def export_fbx(file_path, joints):
+    '''
+    Exports only the given joints and their animation to an FBX file
+
+        Parameters:
+            file_path (string): Path of the FBX file, without extension
+            joints (list of strings): Baked joints to export
+    '''
+    maya.cmds.loadPlugin('fbxmaya', quiet=True)
+    maya.mel.eval('FBXResetExport')
+    maya.mel.eval('FBXExportInAscii -v false')
+    maya.mel.eval('FBXExportBakeComplexAnimation -v false')
+    maya.mel.eval('FBXExportConstraints -v false')
+    maya.mel.eval('FBXExportInputConnections -v false')
+    maya.mel.eval('FBXExportSkins -v false')
+    maya.mel.eval('FBXExportShapes -v false')
+    maya.mel.eval('FBXExportCameras -v false')
+    maya.mel.eval('FBXExportLights -v false')
+
+    maya.cmds.select(joints, r=True)
+    maya.cmds.file(file_path + '.fbx', exportSelected=True, type='FBX export',
+                   preserveReferences=False, force=True)
+
+    return file_path + '.fbx'
+
+
+def export_skeleton(file_path, joints):
+    '''
+    Saves a stripped Maya scene that contains only the given joints and
+    their baked animation, without the rig's meshes, controls or references
+
+        Parameters:
+            file_path (string): Path of the scene, without extension
+            joints (list of strings): Baked joints to export
+    '''
+    maya.cmds.select(joints, r=True)
+    maya.cmds.file(file_path + '.mb', exportSelected=True, type='mayaBinary',
+                   preserveReferences=False, constructionHistory=False, channels=True,
+                   constraints=False, expressions=False, shader=False, force=True)
+
+    return file_path + '.mb'
+
+
+def save_output(file_path, joints, output_format='scene'):
+    '''
+    Writes the baked animation to file_path in one of these output formats:
+        'scene': Saves the whole scene (the default)
+        'fbx': Exports only the baked joints to FBX, see export_fbx()
+        'skeleton': Saves a scene containing only the baked joints, see export_skeleton()
+
+    Returns the path of the written file
+    '''
+    if output_format == 'fbx':
+        return export_fbx(file_path, joints)
+
+    if output_format == 'skeleton':
+        return export_skeleton(file_path, joints)
+
+    if output_format != 'scene':
+        maya.cmds.error('Unknown output format: {0}'.format(output_format))
+
+    save_file(file_path)
+    return maya.cmds.file(q=True, sceneName=True)
+
+
 ##############  End of Helper Functions  ###############
 
 
-def apply_animation(rig_path, anim_path, save_dir):
-    # Create new scene
-    maya.cmds.file(new=True, force=True)
+def bake_animation_onto_rig(rig_ns, rig_joints, anim_path, save_dir, reduce_keys=False, handles=0,
+                            output_format='scene', record=None):
+    '''
+    References the animation in anim_path into the current scene, bakes it
+    onto rig_joints, removes the animation reference and saves the scene
+    to save_dir. The rig must already be referenced under rig_ns.
 
-    # Create rig and anim namespace
-    rig_ns = create_file_namespace(rig_path)
-    anim_ns = create_file_namespace(anim_path)
+    If reduce_keys is True, keys that can be rebuilt by interpolation are
+    removed from the baked curves (see key_reduction, requires NumPy).
 
-    # Bring in rig skeleton and animation
-    create_reference(rig_path, rig_ns)
-    create_reference(anim_path, anim_ns)
+    The bake covers exactly the keyed range of the animation, plus `handles`
+    frames on each side.
 
-    # Grab joints from skeleton and animation
-    maya.cmds.select(cl=True)
-    rig_joints = get_joints_from_namespace(rig_ns)
-    anim_joints = get_joints_from_namespace(anim_ns)
+    output_format picks what is written to save_dir, see save_output().
+
+    The time spent in each stage is added to record (see bake_telemetry).
+    '''
+    if record is None:
+        record = BakeRecord(anim_path)
+
+    with record.stage('reference_anim'):
+        anim_ns = create_file_namespace(anim_path)
+        create_reference(anim_path, anim_ns)
+
+        # Grab joints from animation
+        maya.cmds.select(cl=True)
+        anim_joints = get_joints_from_namespace(anim_ns)
 
-    # We want the current framerate and the referenced
-    # animation framerates to match
-    first_keyframe = maya.cmds.findKeyframe(anim_joints[0], which="first")
-    maya.cmds.playbackOptions(
-        animationStartTime=first_keyframe, minTime=first_keyframe)
-    maya.cmds.currentTime(first_keyframe)
+    # We want the playback range to match the keyed
+    # range of every animated joint
+    with record.stage('bake_range'):
+        start_time, end_time = get_bake_range(anim_joints, handles)
+        maya.cmds.playbackOptions(
+            animationStartTime=start_time, minTime=start_time,
+            animationEndTime=end_time, maxTime=end_time)
+        maya.cmds.currentTime(start_time)
+
+    record.data['joints'] = len(rig_joints)
+    record.data['frames'] = int(end_time - start_time) + 1
 
     # Connect joints from skeleton to animation
-    connect_joints(anim_joints, rig_joints, rig_ns)
+    with record.stage('constraints'):
+        connect_joints(anim_joints, rig_joints, rig_ns)
 
     # Shake 'n Bake animation bones onto character bones
-    start_time = maya.cmds.playbackOptions(q=True, min=True)
-    end_time = maya.cmds.playbackOptions(q=True, max=True)
-
-    maya.cmds.select(cl=True)
-    maya.cmds.select(rig_joints)
-    maya.cmds.bakeResults(simulation=True,
-                          time=(start_time, end_time),
-                          sampleBy=1,
-                          oversamplingRate=1,
-                          disableImplicitControl=True,
-                          preserveOutsideKeys=True,
-                          sparseAnimCurveBake=False,
-                          removeBakedAnimFromLayer=False,
-                          bakeOnOverrideLayer=False,
-                          minimizeRotation=True,
-                          controlPoints=False,
-                          shape=True)
+    with record.stage('bake'):
+        maya.cmds.select(cl=True)
+        maya.cmds.select(rig_joints)
+        maya.cmds.bakeResults(simulation=True,
+                              time=(start_time, end_time),
+                              sampleBy=1,
+                              oversamplingRate=1,
+                              disableImplicitControl=True,
+                              preserveOutsideKeys=True,
+                              sparseAnimCurveBake=False,
+                              removeBakedAnimFromLayer=False,
+                              bakeOnOverrideLayer=False,
+                              minimizeRotation=True,
+                              controlPoints=False,
+                              shape=True)
+
+    # Simplify the baked curves
+    if reduce_keys:
+        with record.stage('reduce_keys'):
+            from key_reduction import reduce_baked_keys
+            reduce_baked_keys(rig_joints)
 
     # Remove animation reference
-    maya.cmds.file(anim_path, rr=True)
+    with record.stage('remove_reference'):
+        maya.cmds.file(anim_path, rr=True)
 
     # Save file
     new_filename = os.path.join(save_dir, 'character_{}'.format(anim_ns))
 
-    save_file(new_filename)
+    with record.stage('save'):
+        saved_file = save_output(new_filename, rig_joints, output_format)
+
+    record.data['output_file'] = saved_file
+    if saved_file and os.path.exists(saved_file):
+        record.data['file_size'] = os.path.getsize(saved_file)
+
+
+def apply_animation(rig_path, anim_path, save_dir, reduce_keys=False, handles=0, output_format='scene',
+                    log_path=None):
+    # If log_path is given, a record of the time spent in each stage
+    # is appended to it (see bake_telemetry)
+    with bake_record(anim_path, log_path) as record:
+        # Create new scene
+        with record.stage('new_scene'):
+            maya.cmds.file(new=True, force=True)
+
+        # Create rig namespace and bring in rig skeleton
+        with record.stage('reference_rig'):
+            rig_ns = create_file_namespace(rig_path)
+            create_reference(rig_path, rig_ns)
+
+            # Grab joints from skeleton
+            rig_joints = get_joints_from_namespace(rig_ns)
+
+        bake_animation_onto_rig(rig_ns, rig_joints, anim_path, save_dir, reduce_keys=reduce_keys,
+                                handles=handles, output_format=output_format, record=record)
+
+
+###############  Persistent Rig Session  ###############
+
+
+# Node types a clip adds to the scene: the constraints connecting the rig to
+# the animation, the baked curves, and the pair blends keying a constrained
+# channel adds. reset_rig_session() deletes only new nodes of these types.
+SESSION_NODE_TYPES = ['constraint', 'animCurve', 'pairBlend']
+
 
+def record_rig_state(rig_joints):
+    '''
+    Returns the state of rig_joints that a clip can change: the value of every
+    keyable attribute, the user defined attributes and the incoming connections
+    of each joint, see restore_rig_state()
+    '''
+    values = dict()
+    user_attrs = dict()
+    connections = dict()
+
+    for j in rig_joints:
+        user_attrs[j] = set(maya.cmds.listAttr(j, userDefined=True) or [])
+        connections[j] = rig_connections(j)
+        for attr in maya.cmds.listAttr(j, keyable=True, scalar=True) or []:
+            plug = '{}.{}'.format(j, attr)
+            values[plug] = maya.cmds.getAttr(plug)
+
+    return {'values': values, 'user_attrs': user_attrs, 'connections': connections}
+
+
+def rig_connections(joint):
+    ''' Returns the set of (source plug, destination plug) connections into joint '''
+    pairs = maya.cmds.listConnections(joint, source=True, destination=False,
+                                      connections=True, plugs=True) or []
+
+    # listConnections returns [destination, source, destination, source, ...]
+    return set(zip(pairs[1::2], pairs[0::2]))
 
-def batch_animations(char_location, anim_location, save_dir):
+
+def restore_rig_state(rig_joints, state, tolerance=1e-6):
+    '''
+    Puts rig_joints back into a state recorded by record_rig_state(): removes the
+    attributes and incoming connections added since, restores the recorded
+    connections and values
+
+        Returns:
+            True if the rig now matches state, False if something could not be restored
+    '''
+    for j in rig_joints:
+        for attr in maya.cmds.listAttr(j, userDefined=True) or []:
+            if attr not in state['user_attrs'][j]:
+                maya.cmds.deleteAttr(j, attribute=attr)
+
+        current = rig_connections(j)
+        for src, dst in current - state['connections'][j]:
+            maya.cmds.disconnectAttr(src, dst)
+        for src, dst in state['connections'][j] - current:
+            maya.cmds.connectAttr(src, dst, force=True)
+
+    for plug, value in state['values'].items():
+        if (maya.cmds.getAttr(plug) != value and not maya.cmds.getAttr(plug, lock=True) and
+                not maya.cmds.listConnections(plug, source=True, destination=False)):
+            maya.cmds.setAttr(plug, value)
+
+    # check the rig really is back to the recorded state
+    for j in rig_joints:
+        if (set(maya.cmds.listAttr(j, userDefined=True) or []) != state['user_attrs'][j] or
+                rig_connections(j) != state['connections'][j]):
+            return False
+
+    for plug, value in state['values'].items():
+        if abs(maya.cmds.getAttr(plug) - value) > tolerance:
+            return False
+
+    return True
+
+
+def start_rig_session(rig_path):
+    '''
+    Creates a new scene, references the rig once and records the state of
+    the scene so it can be restored after each clip with reset_rig_session().
+
+        Parameters:
+            rig_path (string): Path of the character rig
+
+        Returns:
+            A dictionary describing the session
+    '''
+    maya.cmds.file(new=True, force=True)
+
+    rig_ns = create_file_namespace(rig_path)
+    create_reference(rig_path, rig_ns)
+    rig_joints = get_joints_from_namespace(rig_ns)
+
+    references = maya.cmds.file(q=True, reference=True) or []
+
+    return {'rig_ns': rig_ns,
+            'rig_joints': rig_joints,
+            'rig_reference': maya.cmds.referenceQuery(references[0], referenceNode=True),
+            'references': set(references),
+            'nodes': set(maya.cmds.ls(type=SESSION_NODE_TYPES) or []),
+            'rig_state': record_rig_state(rig_joints),
+            'reloads': 0,
+            'playback': (maya.cmds.playbackOptions(q=True, min=True),
+                         maya.cmds.playbackOptions(q=True, max=True),
+                         maya.cmds.playbackOptions(q=True, animationStartTime=True),
+                         maya.cmds.playbackOptions(q=True, animationEndTime=True)),
+            'time': maya.cmds.currentTime(q=True)}
+
+
+def reset_rig_session(session):
+    '''
+    Puts the scene back into the state recorded by start_rig_session(), in
+    place: removes any animation reference a failed clip left behind, deletes
+    the constraints, baked curves and pair blends the last clip created,
+    restores the rig joints' attributes, connections and values, and resets
+    the playback range and current time.
+
+    Only if the rig cannot be restored in place is the rig reference unloaded,
+    stripped of its edits and reloaded from disk (counted in session['reloads']).
+    '''
+    # remove any animation reference left behind by a clip that failed
+    for ref in maya.cmds.file(q=True, reference=True) or []:
+        if ref not in session['references']:
+            maya.cmds.file(ref, rr=True)
+
+    new_nodes = [n for n in maya.cmds.ls(type=SESSION_NODE_TYPES) or [] if n not in session['nodes']]
+    if new_nodes:
+        maya.cmds.delete(new_nodes)
+
+    if not restore_rig_state(session['rig_joints'], session['rig_state']):
+        # edits to a loaded reference cannot be removed, so unload it first
+        rig_reference = session['rig_reference']
+        maya.cmds.file(unloadReference=rig_reference)
+        maya.cmds.referenceEdit(rig_reference, removeEdits=True, successfulEdits=True, failedEdits=True)
+        maya.cmds.file(loadReference=rig_reference)
+        session['reloads'] += 1
+
+    min_time, max_time, start_time, end_time = session['playback']
+    maya.cmds.playbackOptions(minTime=min_time, maxTime=max_time,
+                              animationStartTime=start_time, animationEndTime=end_time)
+    maya.cmds.currentTime(session['time'])
+
+
+def apply_animation_in_session(session, anim_path, save_dir, reduce_keys=False, handles=0,
+                               output_format='scene', log_path=None):
+    '''
+    Bakes anim_path onto the rig of a session started with start_rig_session(),
+    saves a copy to save_dir and resets the rig for the next clip. The saved
+    file matches the one apply_animation() writes from a fresh scene.
+    '''
+    with bake_record(anim_path, log_path) as record:
+        try:
+            bake_animation_onto_rig(session['rig_ns'], session['rig_joints'], anim_path, save_dir,
+                                    reduce_keys=reduce_keys, handles=handles,
+                                    output_format=output_format, record=record)
+        finally:
+            with record.stage('reset_rig'):
+                reset_rig_session(session)
+
+
+##############  End of Persistent Rig Session  ###############
+
+
+def batch_animations(char_location, anim_location, save_dir, workers=1, persistent_rig=False,
+                     reduce_keys=False, handles=0, log_path=None, recursive=False,
+                     output_format='scene'):
     '''
     Defines the locations of the animations, character rig, and where the 
     applied animations will be saved. Then loops through the folder that 
     contains the animations and sends the animation, rig, and save directory
     to apply_animations() to be applied and saved.
+
+    If workers is greater than 1, the animations are instead split across
+    that many headless mayapy processes (see parallel_batch_anim).
+
+    If persistent_rig is True, the rig is referenced once per batch (or once
+    per worker) and only the animation reference is swapped for each clip.
+
+    If reduce_keys is True, redundant keys are removed from each baked clip
+    before it is saved (see key_reduction).
+
+    Each clip is baked over exactly its keyed range, plus `handles` frames
+    on each side.
+
+    If log_path is given, one JSON record per clip with the time spent in each
+    stage is appended to it. Run bake_telemetry.py on it for a summary.
+
+    If recursive is True, .ma files in sub folders of anim_location are
+    baked as well.
+
+    output_format is 'scene' to save each clip as a full scene, 'fbx' to
+    export only the baked joints to FBX or 'skeleton' to save a scene with
+    only the baked joints (see save_output()).
+
+    Returns a list with one dictionary per animation file, in the order the
+    files were found: {'anim_file', 'success', 'error'}. A clip that fails
+    does not stop the batch.
     '''
 
-    anim_files = [os.path.join(anim_location, f) for f in os.listdir(
-        anim_location) if (os.path.exists(os.path.join(anim_location, f)) and f.endswith('.ma'))]
+    if workers > 1:
+        from parallel_batch_anim import batch_animations_parallel
+        return batch_animations_parallel(char_location, anim_location, save_dir,
+                                         workers=workers, persistent_rig=persistent_rig,
+                                         recursive=recursive,
+                                         reduce_keys=reduce_keys, handles=handles,
+                                         output_format=output_format, log_path=log_path)
+
+    anim_files = discover_files(anim_location, include=['*.ma'], recursive=recursive)
+    bake_options = {'reduce_keys': reduce_keys, 'handles': handles,
+                    'output_format': output_format, 'log_path': log_path}
+
+    session = None
+    if persistent_rig:
+        session = start_rig_session(char_location)
 
     # For each animation file in anim_files, apply the animation to the character and save
+    results = []
     for a in anim_files:
-        apply_animation(char_location, a, save_dir)
+        result = {'anim_file': a, 'success': True, 'error': None}
+        try:
+            if session is not None:
+                apply_animation_in_session(session, a, save_dir, **bake_options)
+            else:
+                apply_animation(char_location, a, save_dir, **bake_options)
+        except Exception as e:
+            result['success'] = False
+            result['error'] = str(e)
+
+        results.append(result)
+
+    return results
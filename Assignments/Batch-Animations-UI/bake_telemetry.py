@@ -0,0 +1,169 @@
+'''
+Per-stage timing telemetry for batch bake jobs.
+
+apply_batch_anim fills in one BakeRecord per clip (wall-clock time of each
+stage, joint and frame counts, output file size, success or failure) and
+appends it as one JSON line to a log file. This module does not import
+Maya, so records and reports can be produced with a stand-in maya.cmds.
+
+To print a summary of a log:
+
+python bake_telemetry.py path/to/bake_log.jsonl
+'''
+
+import contextlib
+import json
+import sys
+import timeit
+
+
+class BakeRecord(object):
+    '''
+    Timing and result data for baking a single clip
+
+        Parameters:
+            anim_file (string): Path of the animation being baked
+    '''
+
+    def __init__(self, anim_file):
+        self.start = timeit.default_timer()
+        self.data = {'anim_file': anim_file,
+                     'success': False,
+                     'error': None,
+                     'stages': dict(),
+                     'total': 0.0,
+                     'joints': 0,
+                     'frames': 0,
+                     'output_file': None,
+                     'file_size': None}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        ''' Times the body of a with block as the stage `name` '''
+        stage_start = timeit.default_timer()
+        try:
+            yield
+        finally:
+            stages = self.data['stages']
+            stages[name] = stages.get(name, 0.0) + timeit.default_timer() - stage_start
+
+    def finish(self, success, error=None):
+        ''' Marks the record as done and stores the total wall-clock time '''
+        self.data['success'] = success
+        self.data['error'] = error
+        self.data['total'] = timeit.default_timer() - self.start
+
+
+@contextlib.contextmanager
+def bake_record(anim_file, log_path=None):
+    '''
+    Yields a BakeRecord for the body of a with block. When the block ends the
+    record is finished as a success, or as a failure if it raised, and is
+    appended to log_path if one is given. Exceptions are re-raised.
+
+        Parameters:
+            anim_file (string): Path of the animation being baked
+            log_path (string): Path of the JSONL log, or None to not log
+    '''
+    record = BakeRecord(anim_file)
+    try:
+        yield record
+    except Exception as e:
+        record.finish(False, str(e))
+        if log_path:
+            write_record(log_path, record)
+        raise
+
+    record.finish(True)
+    if log_path:
+        write_record(log_path, record)
+
+
+def write_record(log_path, record):
+    '''
+    Appends record to the JSONL log at log_path. Each record is written with
+    a single write so records from several worker processes do not interleave.
+
+        Parameters:
+            log_path (string): Path of the log file
+            record (BakeRecord): Finished record
+    '''
+    with open(log_path, 'a') as f:
+        f.write(json.dumps(record.data, sort_keys=True) + '\n')
+
+
+def read_records(log_path):
+    ''' Returns the list of records stored in the JSONL log at log_path '''
+    records = []
+    with open(log_path, 'r') as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    return records
+
+
+###############  Report  ###############
+
+
+def percentile(values, p):
+    ''' Returns the p-th percentile (0 - 100) of values by nearest rank '''
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = int(round(p / 100.0 * (len(ordered) - 1)))
+    return ordered[rank]
+
+
+def summarize(records, slowest=5):
+    '''
+    Builds a summary of bake records
+
+        Parameters:
+            records (list of dictionaries): Records read from a log
+            slowest (int): Number of slowest clips to list
+
+        Returns:
+            A dictionary with the clip and failure counts, p50/p90/p99 of the
+            total and of every stage, and the slowest clips
+    '''
+    stage_times = dict()
+    for r in records:
+        for name, seconds in r['stages'].items():
+            stage_times.setdefault(name, []).append(seconds)
+
+    totals = [r['total'] for r in records]
+
+    def stats(values):
+        return {'p50': percentile(values, 50),
+                'p90': percentile(values, 90),
+                'p99': percentile(values, 99),
+                'sum': sum(values)}
+
+    return {'clips': len(records),
+            'failed': [r['anim_file'] for r in records if not r['success']],
+            'total': stats(totals),
+            'stages': dict((name, stats(values)) for name, values in stage_times.items()),
+            'slowest': [(r['anim_file'], r['total']) for r in
+                        sorted(records, key=lambda r: r['total'], reverse=True)[:slowest]]}
+
+
+def print_summary(summary):
+    ''' Prints a summary built by summarize() '''
+    print('{} clips, {} failed'.format(summary['clips'], len(summary['failed'])))
+
+    print('{:<20}{:>10}{:>10}{:>10}{:>12}'.format('stage', 'p50', 'p90', 'p99', 'total'))
+    rows = sorted(summary['stages'].items(), key=lambda s: s[1]['sum'], reverse=True)
+    for name, s in rows + [('(clip)', summary['total'])]:
+        print('{:<20}{:>10.3f}{:>10.3f}{:>10.3f}{:>12.3f}'.format(
+            name, s['p50'], s['p90'], s['p99'], s['sum']))
+
+    print('slowest clips:')
+    for anim_file, seconds in summary['slowest']:
+        print('  {:>10.3f}  {}'.format(seconds, anim_file))
+
+    for anim_file in summary['failed']:
+        print('FAILED: {}'.format(anim_file))
+
+
+if __name__ == '__main__':
+    print_summary(summarize(read_records(sys.argv[1])))
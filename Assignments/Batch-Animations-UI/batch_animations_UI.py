@@ -5,8 +5,10 @@ This script provides the user with a User Interface tool that
 allows them to batch a series of animation files onto a character
 rig and save the connected animations to a specified directory.
 
-Make sure the file apply_batch_animations_MEL is added to your
-Maya scripts so the file can be properly imported. Then, run this
+Make sure the files apply_batch_anim, parallel_batch_anim,
+bake_telemetry and, from Assignments/Shared,
+file_discovery, job_runner and key_reduction are added to your Maya
+scripts so the files can be properly imported. Then, run this
 code inside of Maya:
 
 try:
@@ -19,11 +21,14 @@ dialog = batch_animations_UI.BatchAnimDialog()
 dialog.show()
 '''
 
-from apply_batch_animations_MEL import batch_animations
+from file_discovery import discover_files
+from job_runner import JobRunner, JobProgressWidget
 from PySide2 import QtCore, QtWidgets, QtGui
 from shiboken2 import wrapInstance
 import maya.OpenMayaUI
+import apply_batch_anim
 import os
+import parallel_batch_anim
 
 
 def get_maya_window():
@@ -37,6 +42,21 @@ def get_maya_window():
 
 class BatchAnimDialog(QtWidgets.QDialog):
 
+    dlg_instance = None
+
+    # ensures that there is only 1 instance of the BatchAnimDialog at a
+    # time and brings it to the front if it is behind another window
+    @classmethod
+    def show_dialog(cls):
+        if not cls.dlg_instance:
+            cls.dlg_instance = BatchAnimDialog()
+
+        if cls.dlg_instance.isHidden():
+            cls.dlg_instance.show()
+        else:
+            cls.dlg_instance.raise_()
+            cls.dlg_instance.activateWindow()
+
     # constructor
     def __init__(self):
 
@@ -80,6 +100,18 @@ class BatchAnimDialog(QtWidgets.QDialog):
         self.save_file_input_btn = QtWidgets.QPushButton()
         self.save_file_input_btn.setIcon(QtGui.QIcon(':fileOpen.png'))
 
+        # bake in a headless mayapy worker so maya stays responsive
+        self.background_check = QtWidgets.QCheckBox('Bake in a background mayapy process')
+        self.background_check.setChecked(True)
+
+        # reference the rig once and reset it in place between clips
+        self.persistent_check = QtWidgets.QCheckBox('Keep the rig loaded between clips')
+        self.persistent_check.setChecked(True)
+
+        # progress, cancel, and results of the running batch
+        self.runner = JobRunner(self)
+        self.progress_widget = JobProgressWidget(self.runner)
+
         # create buttons
         self.batch_btn = QtWidgets.QPushButton('Batch')
         self.cancel_btn = QtWidgets.QPushButton('Cancel')
@@ -114,6 +146,9 @@ class BatchAnimDialog(QtWidgets.QDialog):
         self.main_layout.addLayout(self.char_layout)
         self.main_layout.addLayout(self.anim_layout)
         self.main_layout.addLayout(self.save_layout)
+        self.main_layout.addWidget(self.background_check)
+        self.main_layout.addWidget(self.persistent_check)
+        self.main_layout.addWidget(self.progress_widget)
         self.main_layout.addLayout(self.btn_layout)
 
     def browse_char_path(self):
@@ -141,6 +176,18 @@ class BatchAnimDialog(QtWidgets.QDialog):
         self.batch_btn.clicked.connect(self.execute_batch)
         self.cancel_btn.clicked.connect(self.close)
 
+        self.runner.finished.connect(self.batch_finished)
+
+    # stop a running batch when the dialog is closed, by the cancel button
+    # or the window's close button
+    def closeEvent(self, event):
+        if self.runner.running:
+            self.runner.cancel()
+        super(BatchAnimDialog, self).closeEvent(event)
+
+    def batch_finished(self, results):
+        self.batch_btn.setEnabled(True)
+
     # checks that all inputs are valid and then executes batching
     def execute_batch(self):
 
@@ -169,6 +216,41 @@ class BatchAnimDialog(QtWidgets.QDialog):
                 self, "ERROR: Directory does not exist: {}".format(save_dir))
             return
 
-        # If all inputs are valid, go ahead and batch animations
-        self.close()
-        batch_animations(char_file, anim_dir, save_dir)
+        anim_files = list(discover_files(anim_dir, include=['*.ma'], recursive=False))
+        if not anim_files:
+            QtWidgets.QMessageBox.warning(
+                self, "ERROR", "No .ma files found in {}".format(anim_dir))
+            return
+
+        # If all inputs are valid, go ahead and batch animations.
+        # the dialog stays open to show the progress
+        self.batch_btn.setEnabled(False)
+
+        # both paths bake with apply_batch_anim and the same options,
+        # so they write the same files
+        bake_options = dict()
+        persistent_rig = self.persistent_check.isChecked()
+
+        if self.background_check.isChecked():
+            job = {'char_location': char_file,
+                   'save_dir': save_dir,
+                   'anim_files': anim_files,
+                   'persistent_rig': persistent_rig,
+                   'bake_options': bake_options}
+            self.runner.run_process(parallel_batch_anim.default_worker_cmd() + ['--worker'], job, anim_files,
+                                    parallel_batch_anim.RESULT_PREFIX, item_key='anim_file')
+            return
+
+        # the rig session is started by the first clip, on the event loop like the bakes
+        session = []
+
+        def bake(anim_file):
+            if not persistent_rig:
+                apply_batch_anim.apply_animation(char_file, anim_file, save_dir, **bake_options)
+                return
+
+            if not session:
+                session.append(apply_batch_anim.start_rig_session(char_file))
+            apply_batch_anim.apply_animation_in_session(session[0], anim_file, save_dir, **bake_options)
+
+        self.runner.run_in_process(anim_files, bake)
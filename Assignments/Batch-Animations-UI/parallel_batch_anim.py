@@ -0,0 +1,235 @@
+'''
+Parallel batch driver for apply_batch_anim.
+
+Splits a folder of animations across a pool of headless mayapy worker
+processes. Each worker runs apply_animation() on its share of the files
+and reports one result per file back to the scheduler.
+
+Make sure this file, apply_batch_anim.py and its modules (bake_telemetry,
+file_discovery and key_reduction) are in the same Maya scripts folder,
+the workers only add that folder to their path. To run, call
+batch_animations_parallel() with the appropriate arguments, e.g. from a
+mayapy prompt:
+
+import parallel_batch_anim
+results = parallel_batch_anim.batch_animations_parallel(rig, anim_dir, save_dir, workers=8)
+
+The scheduler itself does not import Maya, so it can be driven with a
+stand-in interpreter by passing a different worker_cmd.
+'''
+
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+
+from file_discovery import discover_files
+
+
+# Prefix of the lines a worker prints for each finished file. Maya writes
+# its own messages to stdout, so anything without this prefix is ignored.
+RESULT_PREFIX = 'BATCH_RESULT '
+
+
+###############  Helper Functions  ###############
+
+
+def find_mayapy():
+    '''
+    Returns the MAYAPY environment variable if set, else the mayapy next to
+    the running Maya or mayapy (sys.executable), else 'mayapy' to be looked
+    up on PATH. Maya's bin folder is usually not on PATH inside the GUI.
+    '''
+    if os.environ.get('MAYAPY'):
+        return os.environ['MAYAPY']
+
+    bin_dir = os.path.dirname(sys.executable)
+    for name in ('mayapy.exe', 'mayapy'):
+        path = os.path.join(bin_dir, name)
+        if os.path.isfile(path):
+            return path
+
+    return 'mayapy'
+
+
+def default_worker_cmd():
+    '''
+    Returns the command used to launch a worker: the mayapy interpreter
+    (see find_mayapy) running this file.
+    '''
+    return [find_mayapy(), os.path.splitext(os.path.abspath(__file__))[0] + '.py']
+
+
+def split_jobs(anim_files, workers):
+    '''
+    Splits anim_files into at most `workers` lists, dealing the files out
+    round-robin so long and short clips are spread across the pool.
+
+        Parameters:
+            anim_files (list of strings): Paths of the animations to bake
+            workers (int): Number of worker processes
+    '''
+    workers = max(1, min(workers, len(anim_files)))
+    return [anim_files[i::workers] for i in range(workers)]
+
+
+def run_worker_process(worker_cmd, char_location, save_dir, anim_files, persistent_rig=False,
+                       bake_options=None):
+    '''
+    Launches a single worker, sends it its share of the files on stdin and
+    returns a dictionary of anim file -> result read back from its stdout.
+    Files the worker never reported on (e.g. because it crashed) are
+    marked as failed with the tail of the worker's stderr.
+
+    bake_options are passed on as keyword arguments to apply_animation().
+    '''
+    job = json.dumps({'char_location': char_location,
+                      'save_dir': save_dir,
+                      'anim_files': anim_files,
+                      'persistent_rig': persistent_rig,
+                      'bake_options': bake_options or dict()})
+
+    results = dict()
+
+    try:
+        process = subprocess.Popen(worker_cmd + ['--worker'],
+                                   stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE,
+                                   universal_newlines=True)
+        out, err = process.communicate(job)
+    except OSError as e:
+        out, err = '', 'Could not launch worker {0}: {1}'.format(worker_cmd, e)
+
+    for line in out.splitlines():
+        if not line.startswith(RESULT_PREFIX):
+            continue
+
+        # a bad line is skipped, the file it was for is reported below
+        # as having no result
+        try:
+            result = json.loads(line[len(RESULT_PREFIX):])
+            results[result['anim_file']] = result
+        except (ValueError, KeyError, TypeError) as e:
+            print('Ignoring malformed worker result {!r}: {}'.format(line, e))
+
+    for a in anim_files:
+        if a not in results:
+            results[a] = {'anim_file': a,
+                          'success': False,
+                          'error': err.strip()[-2000:] or 'Worker exited without a result'}
+
+    return results
+
+
+##############  End of Helper Functions  ###############
+
+
+def batch_animations_parallel(char_location, anim_location, save_dir, workers=None, worker_cmd=None,
+                              persistent_rig=False, recursive=False, **bake_options):
+    '''
+    Bakes every .ma file in anim_location onto the rig in char_location using
+    a pool of headless worker processes, and saves the results to save_dir.
+
+        Parameters:
+            char_location (string): Path of the character rig
+            anim_location (string): Directory containing the animations
+            save_dir (string): Directory where the applied animations will be saved
+            workers (int): Number of worker processes, defaults to the number of cores
+            worker_cmd (list of strings): Command used to launch a worker, defaults
+                to mayapy running this file
+            persistent_rig (bool): True if each worker should reference the rig once
+                and reuse it for all of its clips
+            recursive (bool): True to also bake the .ma files in sub folders
+            bake_options: Any other keyword arguments of apply_animation(), e.g.
+                reduce_keys or handles
+
+        Returns:
+            A list with one dictionary per animation file, in the same order as the
+            files were found: {'anim_file', 'success', 'error'}
+    '''
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    if worker_cmd is None:
+        worker_cmd = default_worker_cmd()
+
+    anim_files = list(discover_files(anim_location, include=['*.ma'], recursive=recursive))
+    if not anim_files:
+        return []
+
+    results = dict()
+    lock = threading.Lock()
+
+    def run(job_files):
+        job_results = run_worker_process(worker_cmd, char_location, save_dir, job_files,
+                                         persistent_rig, bake_options)
+        with lock:
+            results.update(job_results)
+
+    # Each worker is waited on from its own thread so one slow worker
+    # never blocks reading the output of the others
+    threads = [threading.Thread(target=run, args=(job,))
+               for job in split_jobs(anim_files, workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return [results[a] for a in anim_files]
+
+
+def worker_main():
+    '''
+    Entry point of a worker process. Reads its job from stdin, starts Maya
+    in standalone mode and bakes each file, printing one result per file.
+    If the job has a cancel_file, the worker stops before the next file
+    once that file exists.
+    '''
+    # without a job there is nothing to report per file, the scheduler
+    # reports this error for each of them instead
+    try:
+        job = json.loads(sys.stdin.read())
+    except ValueError as e:
+        sys.stderr.write('Could not read the worker job: {}\n'.format(e))
+        sys.exit(1)
+
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+
+    import apply_batch_anim
+
+    session = None
+    if job.get('persistent_rig'):
+        session = apply_batch_anim.start_rig_session(job['char_location'])
+
+    cancel_file = job.get('cancel_file')
+
+    for a in job['anim_files']:
+        if cancel_file and os.path.exists(cancel_file):
+            break
+
+        result = {'anim_file': a, 'success': True, 'error': None}
+        try:
+            if session is not None:
+                apply_batch_anim.apply_animation_in_session(session, a, job['save_dir'],
+                                                            **job['bake_options'])
+            else:
+                apply_batch_anim.apply_animation(job['char_location'], a, job['save_dir'],
+                                                 **job['bake_options'])
+        except Exception as e:
+            result['success'] = False
+            result['error'] = str(e)
+
+        sys.stdout.write(RESULT_PREFIX + json.dumps(result) + '\n')
+        sys.stdout.flush()
+
+    maya.standalone.uninitialize()
+
+
+if __name__ == '__main__':
+    if '--worker' in sys.argv:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        worker_main()
@@ -0,0 +1,182 @@
+'''
+Plugin-free camera animation export to a compact columnar file.
+
+A .camchan file holds the per-frame world translation, world rotation
+and focal length of one camera, without going through the FBX plugin:
+
+    8 bytes    magic, b'CAMCHAN1'
+    4 bytes    little-endian uint32, length of the JSON header
+    header     UTF-8 JSON, padded with spaces so the data is 16-byte aligned
+    data       little-endian float32, one column after another, each
+               header['frames'] values long, in header['columns'] order
+
+The header also records the camera, frame rate, frame range, rotate
+order, units and film aperture. read_channels() memory-maps the data,
+so tools can read single columns of long shots without loading the
+whole file.
+
+write_channels() and read_channels() only need NumPy. extract_camera()
+samples a camera in Maya with one pass over the frames, evaluating the
+plugs at each frame's time without changing the current time.
+'''
+
+import json
+import struct
+
+import numpy
+
+
+MAGIC = b'CAMCHAN1'
+
+CHANNELS_EXTENSION = '.camchan'
+
+# Columns written by extract_camera(), translation in centimeters and
+# rotation in degrees, both in world space
+CAMERA_COLUMNS = ['frame', 'translateX', 'translateY', 'translateZ',
+                  'rotateX', 'rotateY', 'rotateZ', 'focalLength']
+
+ROTATE_ORDERS = ['xyz', 'yzx', 'zxy', 'xzy', 'yxz', 'zyx']
+
+
+def write_channels(file_path, columns, header=None):
+    '''
+    Writes columns to a .camchan file
+
+        Parameters:
+            file_path (string): Path of the file to write
+            columns (list of (string, sequence) pairs): Column names and their values,
+                every column must have the same length
+            header (dictionary): Extra header entries, e.g. the camera name
+    '''
+    names = [name for name, _ in columns]
+    data = numpy.array([values for _, values in columns], dtype='<f4').reshape(len(names), -1)
+
+    header = dict(header or {}, columns=names, frames=data.shape[1], dtype='<f4')
+    header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+
+    # pad the header so the data starts on a 16 byte boundary
+    data_offset = len(MAGIC) + 4 + len(header_bytes)
+    header_bytes += b' ' * (-data_offset % 16)
+
+    with open(file_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(data.tobytes())
+
+
+def read_header(file_path):
+    '''
+    Returns (header, data_offset) of a .camchan file
+
+        Parameter:
+            file_path (string): Path of the file
+    '''
+    with open(file_path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('Not a camera channels file: {}'.format(file_path))
+
+        header_length = struct.unpack('<I', f.read(4))[0]
+        header = json.loads(f.read(header_length).decode('utf-8'))
+
+    return header, len(MAGIC) + 4 + header_length
+
+
+def read_channels(file_path, mmap=True):
+    '''
+    Reads a .camchan file
+
+        Parameters:
+            file_path (string): Path of the file
+            mmap (bool): True to memory-map the data instead of reading it
+
+        Returns:
+            (header, columns), where columns maps each column name to a float32 array
+    '''
+    header, data_offset = read_header(file_path)
+    shape = (len(header['columns']), header['frames'])
+
+    if mmap and header['frames']:
+        data = numpy.memmap(file_path, dtype=header['dtype'], mode='r', offset=data_offset, shape=shape)
+    else:
+        with open(file_path, 'rb') as f:
+            f.seek(data_offset)
+            data = numpy.fromfile(f, dtype=header['dtype'], count=shape[0] * shape[1]).reshape(shape)
+
+    return header, dict(zip(header['columns'], data))
+
+
+def extract_camera(camera, file_path, frame_range=None, step=1):
+    '''
+    Samples the world translation, world rotation and focal length of camera
+    and writes them to file_path (see write_channels). Each plug is evaluated
+    at each frame's time, the current time is never changed.
+
+        Parameters:
+            camera (string): Camera transform or shape
+            file_path (string): Path of the .camchan file to write
+            frame_range (tuple): (start, end) frames, the playback range if None
+            step (float): Frames between samples
+
+        Returns:
+            The number of frames written
+    '''
+    import maya.cmds
+    import maya.api.OpenMaya as om
+
+    if frame_range is None:
+        frame_range = (maya.cmds.playbackOptions(q=True, minTime=True),
+                       maya.cmds.playbackOptions(q=True, maxTime=True))
+
+    shape = camera
+    if maya.cmds.nodeType(camera) != 'camera':
+        shape = maya.cmds.listRelatives(camera, shapes=True, type='camera', fullPath=True)[0]
+    transform = maya.cmds.listRelatives(shape, parent=True, fullPath=True)[0]
+
+    selection = om.MSelectionList()
+    selection.add(transform)
+    selection.add(shape)
+    dag_path = selection.getDagPath(0)
+
+    world_matrix_plug = om.MFnDependencyNode(dag_path.node()).findPlug('worldMatrix', False)
+    world_matrix_plug = world_matrix_plug.elementByLogicalIndex(dag_path.instanceNumber())
+    focal_length_plug = om.MFnDependencyNode(selection.getDependNode(1)).findPlug('focalLength', False)
+
+    rotate_order = maya.cmds.getAttr(transform + '.rotateOrder')
+    frames = numpy.arange(frame_range[0], frame_range[1] + step * 0.5, step)
+    values = numpy.empty((len(CAMERA_COLUMNS), len(frames)), dtype='<f4')
+    values[0] = frames
+
+    unit = om.MTime.uiUnit()
+    for i, frame in enumerate(frames):
+        context = om.MDGContext(om.MTime(float(frame), unit))
+
+        # Maya 2022 and later evaluate plugs in the context set by a guard
+        if hasattr(om, 'MDGContextGuard'):
+            with om.MDGContextGuard(context):
+                matrix = om.MFnMatrixData(world_matrix_plug.asMObject()).matrix()
+                focal_length = focal_length_plug.asDouble()
+        else:
+            matrix = om.MFnMatrixData(world_matrix_plug.asMObject(context)).matrix()
+            focal_length = focal_length_plug.asDouble(context)
+
+        transformation = om.MTransformationMatrix(matrix)
+        rotation = transformation.rotation().reorder(rotate_order)
+
+        values[1:4, i] = tuple(transformation.translation(om.MSpace.kWorld))
+        values[4:7, i] = numpy.degrees((rotation.x, rotation.y, rotation.z))
+        values[7, i] = focal_length
+
+    header = {'camera': transform,
+              'fps': om.MTime(1.0, om.MTime.kSeconds).asUnits(unit),
+              'frame_range': list(frame_range),
+              'step': step,
+              'rotate_order': ROTATE_ORDERS[rotate_order],
+              'linear_unit': 'cm',
+              'angular_unit': 'deg',
+              'film_aperture': [maya.cmds.getAttr(shape + '.horizontalFilmAperture'),
+                                maya.cmds.getAttr(shape + '.verticalFilmAperture')]}
+
+    write_channels(file_path, list(zip(CAMERA_COLUMNS, values)), header)
+
+    return len(frames)
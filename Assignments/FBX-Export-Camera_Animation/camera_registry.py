@@ -0,0 +1,178 @@
+'''
+Scene-wide camera index for the camera export tools.
+
+CameraRegistry lists every camera shape and its transform with one ls
+query (and one more for their short names) and keeps the result until
+the scene changes. Node added and removed callbacks for cameras, a name
+changed callback for every node, parent added and removed callbacks for
+every DAG node (reparenting or grouping changes both the path and the
+shortest name) and scene open / new callbacks clear the cached list, so
+looking up or searching cameras never walks the scene unless something
+changed.
+
+Use get_registry() to share one registry (and one set of callbacks)
+between every tool in the session. Its callback ids are kept in the
+module across a reload(), and get_registry() removes them before
+registering new ones, so reloading the module never stacks callbacks.
+Call uninstall() to remove them.
+'''
+
+import maya.cmds
+import maya.OpenMaya
+
+
+class CameraRegistry(object):
+    ''' Cached list of the cameras in the scene, cleared by scene callbacks '''
+
+    def __init__(self):
+        self.callback_ids = []
+        self.rebuilds = 0
+        self.entries = None
+        self.by_path = None
+
+    def install(self):
+        ''' Registers the callbacks that clear the cached cameras '''
+        if self.callback_ids:
+            return
+
+        self.callback_ids = [
+            maya.OpenMaya.MDGMessage.addNodeAddedCallback(self.invalidate, 'camera'),
+            maya.OpenMaya.MDGMessage.addNodeRemovedCallback(self.invalidate, 'camera'),
+            maya.OpenMaya.MNodeMessage.addNameChangedCallback(maya.OpenMaya.MObject(), self.invalidate),
+            maya.OpenMaya.MDagMessage.addParentAddedCallback(self.invalidate),
+            maya.OpenMaya.MDagMessage.addParentRemovedCallback(self.invalidate),
+            maya.OpenMaya.MSceneMessage.addCallback(maya.OpenMaya.MSceneMessage.kAfterOpen, self.invalidate),
+            maya.OpenMaya.MSceneMessage.addCallback(maya.OpenMaya.MSceneMessage.kAfterNew, self.invalidate)]
+
+    def uninstall(self):
+        ''' Removes the callbacks registered by install() '''
+        for callback_id in self.callback_ids:
+            maya.OpenMaya.MMessage.removeCallback(callback_id)
+        self.callback_ids = []
+        self.invalidate()
+
+    def invalidate(self, *args):
+        ''' Clears the cached cameras, they are listed again on the next lookup '''
+        self.entries = None
+        self.by_path = None
+
+    def rebuild(self):
+        '''
+        Lists the cameras: one query for the full paths of every camera shape,
+        whose transforms are their parent paths, and one for the short names
+        of the transforms. A transform with several camera shapes is listed
+        once per shape.
+        '''
+        shapes = maya.cmds.ls(type='camera', long=True) or []
+        transforms = [s.rsplit('|', 1)[0] for s in shapes]
+
+        # ls drops repeated names, so only ask for each transform once
+        unique_transforms = []
+        seen = set()
+        for t in transforms:
+            if t not in seen:
+                seen.add(t)
+                unique_transforms.append(t)
+        short_names = maya.cmds.ls(unique_transforms) if unique_transforms else []
+        if len(short_names) != len(unique_transforms):
+            short_names = [maya.cmds.ls(t)[0] for t in unique_transforms]
+        names = dict(zip(unique_transforms, short_names))
+
+        self.entries = []
+        self.by_path = dict()
+        for transform, shape in zip(transforms, shapes):
+            entry = {'name': names[transform], 'transform': transform, 'shape': shape,
+                     'startup': maya.cmds.camera(shape, q=True, startupCamera=True)}
+            self.entries.append(entry)
+            self.by_path.setdefault(transform, entry)
+            self.by_path[shape] = entry
+
+        self.entries.sort(key=lambda e: e['name'].lower())
+        self.rebuilds += 1
+
+    def cameras(self, include_startup=False):
+        '''
+        Returns a list of {'name', 'transform', 'shape', 'startup'} for every
+        camera, sorted by name. name is the shortest unique name of the
+        transform, transform and shape are full paths.
+
+            Parameter:
+                include_startup (bool): True to also list maya's default persp,
+                    top, front and side cameras
+        '''
+        if self.entries is None:
+            self.rebuild()
+
+        if include_startup:
+            return self.entries
+        return [e for e in self.entries if not e['startup']]
+
+    def names(self, include_startup=False):
+        ''' Returns the shortest unique names of the camera transforms, see cameras() '''
+        names = []
+        for e in self.cameras(include_startup):
+            # a transform with several camera shapes has one entry per shape
+            if not names or names[-1] != e['name']:
+                names.append(e['name'])
+        return names
+
+    def search(self, text, include_startup=False):
+        ''' Returns the camera names containing text, ignoring case '''
+        text = text.lower()
+        return [n for n in self.names(include_startup) if text in n.lower()]
+
+    def camera_transform(self, node):
+        '''
+        Returns the shortest unique name of the camera transform that node is,
+        or whose shape node is, None if node is not a camera
+
+            Parameter:
+                node (string): Name of a node
+        '''
+        if self.entries is None:
+            self.rebuild()
+
+        paths = maya.cmds.ls(node, long=True) or []
+        for path in paths:
+            entry = self.by_path.get(path)
+            if entry is not None:
+                return entry['name']
+
+        return None
+
+
+# ids of the shared registry's callbacks. reload() runs the module again in
+# the same namespace, so the ids registered before a reload are kept here
+_callback_ids = globals().get('_callback_ids', [])
+_registry = None
+
+
+def uninstall():
+    ''' Removes the callbacks of the shared registry, and of any registry created before a reload '''
+    global _registry
+
+    if _callback_ids:
+        id_array = maya.OpenMaya.MCallbackIdArray()
+        for callback_id in _callback_ids:
+            id_array.append(callback_id)
+        maya.OpenMaya.MMessage.removeCallbacks(id_array)
+        del _callback_ids[:]
+
+    if _registry is not None:
+        # its callbacks were removed above
+        _registry.callback_ids = []
+        _registry.invalidate()
+        _registry = None
+
+
+def get_registry():
+    ''' Returns the session's CameraRegistry, creating it and its callbacks on first use '''
+    global _registry
+
+    if _registry is None:
+        uninstall()
+        _registry = CameraRegistry()
+        _registry.install()
+        _callback_ids.extend(_registry.callback_ids)
+
+    return _registry
@@ -3,8 +3,14 @@ Krysten Tachiyama
 
 This script provides a UI that allows a user to export a camera
 as a fbx file in the desired path. 
-
-Make sure this file is properly imported to your Maya scripts.
+Several cameras, or every camera in the scene, can be exported at
+once with export_cameras() or the dialog's batch mode.
+The dialog can also write the camera's world transform and focal length
+to a .camchan file without the fbx plugin (see camera_channels).
+
+Make sure this file, camera_registry and camera_channels, and from
+Assignments/Shared job_runner and key_reduction, are properly imported
+to your Maya scripts.
 Then, run this code inside of Maya:
 
 try:
@@ -17,11 +23,15 @@ dialog = fbx_export_camera_UI.ExportFBXCameraDialog()
 dialog.show()
 
 '''
+import os
 import pymel.core
-from PySide2 import QtWidgets, QtGui
+from PySide2 import QtCore, QtWidgets, QtGui
 from shiboken2 import wrapInstance
 import maya.OpenMayaUI
 
+from camera_registry import get_registry
+from job_runner import JobRunner, JobProgressWidget
+
 
 def get_maya_window():
     maya_window_ptr = maya.OpenMayaUI.MQtUtil.mainWindow()
@@ -32,25 +42,251 @@ def get_maya_window():
     return wrapInstance(long(maya_window_ptr), QtWidgets.QWidget)
 
 
-def export_fbx_cam_anim(filename):
-    # export selected camera as fbx to filename
+# default file name of each camera in a batch export. {camera} is the camera's
+# name, {scene} the scene's name and {index} the camera's position in the batch
+NAME_TEMPLATE = "{scene}_{camera}.fbx"
+
+
+# default camera export options. binary files are several times smaller
+# and faster for the engine to parse than ascii ones, every frame is
+# sampled and key reduction is off since it adds a bake to each export
+EXPORT_OPTIONS = {"ascii": False,
+                  "sample_step": 1,
+                  "frame_range": None,
+                  "reduce_keys": False}
+
+
+def get_frame_range(frame_range=None):
+    # returns frame_range, or the playback range if it is None
+
+    if frame_range is not None:
+        return frame_range
+    return (pymel.core.playbackOptions(q=True, minTime=True),
+            pymel.core.playbackOptions(q=True, maxTime=True))
+
+
+def configure_fbx_camera_export(ascii=False, sample_step=1, frame_range=None, reduce_keys=False):
+    # loads the fbx plugin and sets the camera export options.
+    # the options stay set, so a batch only does this once.
+    #   ascii: True to write ascii fbx, binary otherwise
+    #   sample_step: whole frames between the keys baked into the file
+    #   frame_range: (start, end) frames to export, the playback range if None
+    #   reduce_keys: True if the cameras are baked and key reduced before
+    #       export (see export_fbx_cam_anim), so the exporter must not re-bake them
+
+    start, end = get_frame_range(frame_range)
 
     pymel.core.loadPlugin("fbxmaya.mll", quiet=True)
     pymel.core.mel.FBXResetExport()
-    pymel.core.mel.FBXExportInAscii(v=True)
+    pymel.core.mel.FBXExportInAscii(v=ascii)
     pymel.core.mel.FBXExportUpAxis("y")
     pymel.core.mel.FBXExportAnimationOnly(v=False)
     pymel.core.mel.FBXExportCameras(v=True)
-    pymel.core.mel.FBXExport(s=True, f=filename)
+    pymel.core.mel.FBXExportBakeComplexAnimation(v=not reduce_keys)
+    pymel.core.mel.FBXExportBakeComplexStart(v=start)
+    pymel.core.mel.FBXExportBakeComplexEnd(v=end)
+    pymel.core.mel.FBXExportBakeComplexStep(v=sample_step)
+
+
+def bake_and_reduce_camera(camera, sample_step=1, frame_range=None):
+    # bakes the transform and shape of camera every sample_step frames
+    # and removes the keys that can be rebuilt by interpolation
+    # (see key_reduction, requires NumPy)
+
+    from key_reduction import reduce_baked_keys
+
+    camera = pymel.core.PyNode(camera)
+    nodes = [camera, camera.getShape()]
+
+    pymel.core.bakeResults(nodes, time=get_frame_range(frame_range), sampleBy=sample_step,
+                           simulation=False, preserveOutsideKeys=True, sparseAnimCurveBake=False)
+    return reduce_baked_keys([str(n) for n in nodes])
+
+
+def create_export_camera(camera):
+    # renames camera out of the way and returns a duplicate of it under the
+    # world, with camera's name, whose transform and shape follow camera's
+    # through constraints and connections, along with those constraints.
+    # the duplicate can be baked and edited without touching camera,
+    # delete_export_camera() removes it and gives camera its name back
+
+    camera = pymel.core.PyNode(camera)
+    shape = camera.getShape()
+    name = camera.nodeName()
+    camera.rename(name + "_exportSource")
+
+    duplicate = None
+    try:
+        duplicate = pymel.core.duplicate(camera, returnRootsOnly=True)[0]
+        for child in duplicate.getChildren():
+            if child != duplicate.getShape():
+                pymel.core.delete(child)
+
+        for attr in ("translate", "rotate", "scale"):
+            for axis in "XYZ":
+                duplicate.attr(attr + axis).unlock()
+        if duplicate.getParent() is not None:
+            pymel.core.parent(duplicate, world=True)
+        duplicate.rename(name)
+
+        constraints = [pymel.core.parentConstraint(camera, duplicate),
+                       pymel.core.scaleConstraint(camera, duplicate)]
+        for attr in shape.listAttr(keyable=True):
+            duplicate_attr = duplicate.getShape().attr(attr.attrName())
+            duplicate_attr.unlock()
+            attr.connect(duplicate_attr, force=True)
+    except:
+        delete_export_camera(camera, name, duplicate)
+        raise
+
+    return duplicate, constraints
+
+
+def delete_export_camera(camera, name, duplicate=None):
+    # deletes the duplicate made by create_export_camera() and renames
+    # camera back to name
+
+    if duplicate is not None and pymel.core.objExists(duplicate):
+        pymel.core.delete(duplicate)
+    pymel.core.PyNode(camera).rename(name)
+
+
+def export_fbx_cam_anim(filename, configure=True, camera=None, **options):
+    # export selected camera as fbx to filename and returns the file size in bytes.
+    # configure can be False if configure_fbx_camera_export() was already called
+    # with the same options. options are EXPORT_OPTIONS' keys. with reduce_keys,
+    # a duplicate of camera is baked in world space, key reduced and exported
+    # under camera's name, then deleted, so camera itself is never changed
+
+    options = dict(EXPORT_OPTIONS, **options)
+
+    if configure:
+        configure_fbx_camera_export(**options)
 
+    if options["reduce_keys"]:
+        if camera is None:
+            camera = pymel.core.selected()[0]
+
+        camera = pymel.core.PyNode(camera)
+        name = camera.nodeName()
+        duplicate, constraints = create_export_camera(camera)
+        try:
+            bake_and_reduce_camera(duplicate, options["sample_step"], options["frame_range"])
+            pymel.core.delete(constraints)
+            pymel.core.select(duplicate, r=True)
+            pymel.core.mel.FBXExport(s=True, f=filename)
+        finally:
+            delete_export_camera(camera, name, duplicate)
+    else:
+        pymel.core.mel.FBXExport(s=True, f=filename)
+
+    size = os.path.getsize(filename)
+    print("Exported {} ({:.1f} KB)".format(filename, size / 1024.0))
+
+    return size
+
+
+def export_camera_channels(camera, filename, sample_step=1, frame_range=None, **options):
+    # writes the world translation, rotation and focal length of camera
+    # every sample_step frames to filename, without the fbx plugin
+    # (see camera_channels, requires NumPy). the other fbx options are
+    # ignored. returns the file size in bytes
+
+    from camera_channels import extract_camera
+
+    extract_camera(str(camera), filename, get_frame_range(frame_range), sample_step)
+
+    size = os.path.getsize(filename)
+    print("Exported {} ({:.1f} KB)".format(filename, size / 1024.0))
+
+    return size
+
+
+def channels_file_name(filename):
+    # returns filename with the .camchan extension
+
+    from camera_channels import CHANNELS_EXTENSION
+
+    return os.path.splitext(filename)[0] + CHANNELS_EXTENSION
+
+
+def get_camera_transform(node):
+    # returns the name of the camera transform that node is, or whose
+    # shape node is, None if node is not a camera. cameras are looked
+    # up in the scene's camera registry, which is only rebuilt when
+    # the scene changes
+
+    return get_registry().camera_transform(str(node))
+
+
+def list_scene_cameras():
+    # returns the transforms of every camera in the scene, without
+    # maya's default persp, top, front and side cameras
+
+    return get_registry().names()
+
+
+def camera_file_name(camera, index, name_template=NAME_TEMPLATE):
+    # fills in name_template for camera. namespace and path separators
+    # in the camera's name are replaced so the name is a valid file name
+
+    scene = os.path.splitext(os.path.basename(pymel.core.sceneName()))[0] or "untitled"
+    camera_name = str(camera).replace(":", "_").replace("|", "_")
+    return name_template.format(camera=camera_name, scene=scene, index=index)
+
+
+def export_camera_to_dir(camera, output_dir, index=0, name_template=NAME_TEMPLATE, **options):
+    # exports camera to output_dir, named with name_template, and returns
+    # the file name. configure_fbx_camera_export() must already be called
+    # with the same options
+
+    filename = os.path.join(output_dir, camera_file_name(camera, index, name_template))
+    filename = filename.replace("\\", "/")
+
+    pymel.core.select(camera, r=True)
+    export_fbx_cam_anim(filename, configure=False, camera=camera, **options)
 
-def export_selected_cam_anim(camera, filename):
+    return filename
+
+
+def export_cameras(cameras, output_dir, name_template=NAME_TEMPLATE, **options):
+    # exports every camera in cameras to its own fbx file in output_dir,
+    # named with name_template. the fbx exporter is only configured once.
+    # options are EXPORT_OPTIONS' keys, see export_fbx_cam_anim().
+    # cameras that fail to export are skipped, returns a list of the
+    # exported files and a list of (camera, error) for the failed ones
+
+    options = dict(EXPORT_OPTIONS, **options)
+    configure_fbx_camera_export(**options)
+
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    exported = []
+    failed = []
+    selection = pymel.core.selected()
+
+    for index, camera in enumerate(cameras):
+        try:
+            exported.append(export_camera_to_dir(camera, output_dir, index, name_template, **options))
+        except Exception as e:
+            pymel.core.warning("Could not export {}: {}".format(camera, e))
+            failed.append((str(camera), str(e)))
+
+    # put back what the user had selected
+    pymel.core.select(selection, r=True)
+
+    return exported, failed
+
+
+def export_selected_cam_anim(camera, filename, **options):
     # selects camera and tries to call export_fbx_cam_anim()
-    # if funciton cannot be called, throw error
+    # if funciton cannot be called, throw error.
+    # returns the size of the exported file, None if it failed
 
     pymel.core.select(camera, r=True)
     try:
-        export_fbx_cam_anim(filename)
+        return export_fbx_cam_anim(filename, camera=camera, **options)
     except:
         QtWidgets.QMessageBox.critical(
             get_maya_window(), "ERROR", "Something went wrong, cannot export camera")
@@ -91,6 +327,8 @@ class ExportFBXCameraDialog(QtWidgets.QDialog):
         self.create_layouts()
         self.create_connections()
 
+        self.set_batch_mode(False)
+
     def create_widgets(self):
         # initialize camera input label and button
         self.cam_text = QtWidgets.QLabel("      Camera      ")
@@ -103,6 +341,59 @@ class ExportFBXCameraDialog(QtWidgets.QDialog):
         self.exported_file_browse_btn = QtWidgets.QPushButton()
         self.exported_file_browse_btn.setIcon(QtGui.QIcon(":fileOpen.png"))
 
+        # initialize the searchable list of the scene's cameras
+        self.search_line_edit = QtWidgets.QLineEdit()
+        self.search_line_edit.setPlaceholderText("Search cameras")
+        self.scene_cam_list = QtWidgets.QListWidget()
+        self.scene_cam_list.setToolTip("Click to choose a camera, double click to add it to the batch")
+
+        # initialize batch mode widgets: the camera list, its buttons,
+        # the output folder and the file name template
+        self.batch_check = QtWidgets.QCheckBox("Batch export several cameras")
+        self.cam_list = QtWidgets.QListWidget()
+        self.cam_list.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.add_selected_btn = QtWidgets.QPushButton("Add Selected")
+        self.add_all_btn = QtWidgets.QPushButton("Add All Cameras")
+        self.remove_btn = QtWidgets.QPushButton("Remove")
+
+        self.output_dir_text = QtWidgets.QLabel(" Output Folder")
+        self.output_dir_line_edit = QtWidgets.QLineEdit()
+        self.output_dir_browse_btn = QtWidgets.QPushButton()
+        self.output_dir_browse_btn.setIcon(QtGui.QIcon(":fileOpen.png"))
+        self.output_dir_line_edit.setReadOnly(True)
+        self.output_dir_browse_btn.setMaximumWidth(50)
+
+        self.template_text = QtWidgets.QLabel(" File Name")
+        self.template_line_edit = QtWidgets.QLineEdit(NAME_TEMPLATE)
+        self.template_line_edit.setToolTip("{camera}, {scene} and {index} are replaced for each camera")
+
+        # initialize export option widgets
+        self.ascii_check = QtWidgets.QCheckBox("ASCII")
+        self.ascii_check.setToolTip("Binary files are smaller and faster to import")
+        self.step_text = QtWidgets.QLabel(" Sample Step")
+        self.step_spin = QtWidgets.QSpinBox()
+        self.step_spin.setRange(1, 100)
+        self.step_spin.setValue(EXPORT_OPTIONS["sample_step"])
+        self.playback_range_check = QtWidgets.QCheckBox("Playback Range")
+        self.playback_range_check.setChecked(True)
+        self.start_spin = QtWidgets.QSpinBox()
+        self.end_spin = QtWidgets.QSpinBox()
+        for spin in (self.start_spin, self.end_spin):
+            spin.setRange(-100000, 100000)
+            spin.setEnabled(False)
+        self.reduce_check = QtWidgets.QCheckBox("Reduce Keys")
+        self.reduce_check.setToolTip("Bake each camera and remove keys that interpolation can rebuild")
+        self.channels_check = QtWidgets.QCheckBox("Channels Only")
+        self.channels_check.setToolTip("Write the world transform and focal length per frame "
+                                       "to a .camchan file, without the fbx plugin")
+
+        # progress, cancel, and results of the running export.
+        # cameras are exported one per event loop tick so maya stays responsive
+        self.runner = JobRunner(self)
+        self.progress_widget = JobProgressWidget(self.runner)
+        self.exported_files = []
+        self.saved_selection = []
+
         # initialize run, reset, and cnacel buttons
         self.run_btn = QtWidgets.QPushButton("Run")
         self.reset_btn = QtWidgets.QPushButton("Reset")
@@ -119,6 +410,16 @@ class ExportFBXCameraDialog(QtWidgets.QDialog):
     def create_layouts(self):
         self.main_layout = QtWidgets.QVBoxLayout(self)
 
+        # scene camera list layout
+        self.scene_cam_layout = QtWidgets.QVBoxLayout()
+        self.scene_cam_layout.addWidget(self.search_line_edit)
+        self.scene_cam_layout.addWidget(self.scene_cam_list)
+
+        # single camera widgets, hidden in batch mode
+        self.single_widget = QtWidgets.QWidget()
+        self.single_layout = QtWidgets.QVBoxLayout(self.single_widget)
+        self.single_layout.setContentsMargins(0, 0, 0, 0)
+
         # camera input layout
         self.cam_layout = QtWidgets.QHBoxLayout(self)
         self.cam_layout.addWidget(self.cam_text)
@@ -137,9 +438,51 @@ class ExportFBXCameraDialog(QtWidgets.QDialog):
         self.btn_layout.addWidget(self.reset_btn)
         self.btn_layout.addWidget(self.cancel_btn)
 
+        self.single_layout.addLayout(self.cam_layout)
+        self.single_layout.addLayout(self.save_layout)
+
+        # batch widgets, hidden in single camera mode
+        self.batch_widget = QtWidgets.QWidget()
+        self.batch_layout = QtWidgets.QVBoxLayout(self.batch_widget)
+        self.batch_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.cam_list_btn_layout = QtWidgets.QHBoxLayout()
+        self.cam_list_btn_layout.addWidget(self.add_selected_btn)
+        self.cam_list_btn_layout.addWidget(self.add_all_btn)
+        self.cam_list_btn_layout.addWidget(self.remove_btn)
+
+        self.output_dir_layout = QtWidgets.QHBoxLayout()
+        self.output_dir_layout.addWidget(self.output_dir_text)
+        self.output_dir_layout.addWidget(self.output_dir_line_edit)
+        self.output_dir_layout.addWidget(self.output_dir_browse_btn)
+
+        self.template_layout = QtWidgets.QHBoxLayout()
+        self.template_layout.addWidget(self.template_text)
+        self.template_layout.addWidget(self.template_line_edit)
+
+        self.batch_layout.addWidget(self.cam_list)
+        self.batch_layout.addLayout(self.cam_list_btn_layout)
+        self.batch_layout.addLayout(self.output_dir_layout)
+        self.batch_layout.addLayout(self.template_layout)
+
+        # export options layout
+        self.options_layout = QtWidgets.QHBoxLayout()
+        self.options_layout.addWidget(self.ascii_check)
+        self.options_layout.addWidget(self.step_text)
+        self.options_layout.addWidget(self.step_spin)
+        self.options_layout.addWidget(self.playback_range_check)
+        self.options_layout.addWidget(self.start_spin)
+        self.options_layout.addWidget(self.end_spin)
+        self.options_layout.addWidget(self.reduce_check)
+        self.options_layout.addWidget(self.channels_check)
+
         # main layout
-        self.main_layout.addLayout(self.cam_layout)
-        self.main_layout.addLayout(self.save_layout)
+        self.main_layout.addWidget(self.batch_check)
+        self.main_layout.addLayout(self.scene_cam_layout)
+        self.main_layout.addWidget(self.single_widget)
+        self.main_layout.addWidget(self.batch_widget)
+        self.main_layout.addLayout(self.options_layout)
+        self.main_layout.addWidget(self.progress_widget)
         self.main_layout.addLayout(self.btn_layout)
 
     def create_connections(self):
@@ -150,21 +493,131 @@ class ExportFBXCameraDialog(QtWidgets.QDialog):
         self.exported_file_browse_btn.clicked.connect(
             self.exported_file_browse)
 
+        self.search_line_edit.textChanged.connect(self.refresh_scene_cameras)
+        self.scene_cam_list.itemClicked.connect(self.choose_scene_camera)
+        self.scene_cam_list.itemDoubleClicked.connect(self.add_scene_camera)
+
+        self.batch_check.toggled.connect(self.set_batch_mode)
+        self.add_selected_btn.clicked.connect(self.add_selected_cameras)
+        self.add_all_btn.clicked.connect(self.add_all_cameras)
+        self.remove_btn.clicked.connect(self.remove_cameras)
+        self.output_dir_browse_btn.clicked.connect(self.output_dir_browse)
+
+        self.playback_range_check.toggled.connect(self.set_playback_range)
+        self.channels_check.toggled.connect(self.set_channels_only)
+
         self.run_btn.clicked.connect(self.export_camera)
 
         self.reset_btn.clicked.connect(self.clear_text)
 
         self.cancel_btn.clicked.connect(self.close)
 
+        self.runner.finished.connect(self.export_finished)
+
     def clear_text(self):
         # clear the camera and save path inputs
         self.cam_line_edit.setText("")
         self.exported_file_line_edit.setText("")
+        self.cam_list.clear()
+        self.output_dir_line_edit.setText("")
+
+    def showEvent(self, event):
+        super(ExportFBXCameraDialog, self).showEvent(event)
+        self.refresh_scene_cameras()
+
+    def changeEvent(self, event):
+        # the scene may have changed while the dialog was in the background.
+        # the list is cached by the registry, so this is cheap if it didn't
+        super(ExportFBXCameraDialog, self).changeEvent(event)
+        if event.type() == QtCore.QEvent.ActivationChange and self.isActiveWindow():
+            self.refresh_scene_cameras()
+
+    def refresh_scene_cameras(self, *args):
+        # list the scene's cameras that match the search text
+        self.scene_cam_list.clear()
+        self.scene_cam_list.addItems(get_registry().search(self.search_line_edit.text()))
+
+    def choose_scene_camera(self, item):
+        # in single camera mode, clicking a camera chooses it
+        if not self.batch_check.isChecked():
+            self.cam_line_edit.setText(item.text())
+
+    def add_scene_camera(self, item):
+        # in batch mode, double clicking a camera adds it to the batch
+        if self.batch_check.isChecked():
+            self.add_cameras_to_list([item.text()])
+
+    def set_batch_mode(self, batch):
+        # show the camera list and output folder in batch mode,
+        # the single camera and file inputs otherwise
+        self.single_widget.setVisible(not batch)
+        self.batch_widget.setVisible(batch)
+
+    def set_playback_range(self, use_playback_range):
+        # the frame range inputs start at the playback range and are
+        # only editable when it is not used
+        if not use_playback_range:
+            start, end = get_frame_range()
+            self.start_spin.setValue(int(start))
+            self.end_spin.setValue(int(end))
+
+        self.start_spin.setEnabled(not use_playback_range)
+        self.end_spin.setEnabled(not use_playback_range)
+
+    def set_channels_only(self, channels_only):
+        # ascii and key reduction only apply to fbx files
+        self.ascii_check.setEnabled(not channels_only)
+        self.reduce_check.setEnabled(not channels_only)
+
+    def export_options(self):
+        # returns the export options set in the dialog
+        frame_range = None
+        if not self.playback_range_check.isChecked():
+            frame_range = (self.start_spin.value(), self.end_spin.value())
+
+        return {"ascii": self.ascii_check.isChecked(),
+                "sample_step": self.step_spin.value(),
+                "frame_range": frame_range,
+                "reduce_keys": self.reduce_check.isChecked()}
+
+    def add_cameras_to_list(self, cameras):
+        # add cameras to the batch list, skipping ones already in it
+        listed = set(self.cam_list.item(i).text() for i in range(self.cam_list.count()))
+        for camera in cameras:
+            if str(camera) not in listed:
+                self.cam_list.addItem(str(camera))
+                listed.add(str(camera))
+
+    def add_selected_cameras(self):
+        # add the selected cameras (or transforms with a camera shape)
+        cameras = [get_camera_transform(node) for node in pymel.core.selected()]
+        cameras = [c for c in cameras if c is not None]
+
+        if not cameras:
+            QtWidgets.QMessageBox.critical(
+                get_maya_window(), "Selection Error", "No cameras were selected")
+            return
+
+        self.add_cameras_to_list(cameras)
+
+    def add_all_cameras(self):
+        # add every camera in the scene
+        self.add_cameras_to_list(list_scene_cameras())
+
+    def remove_cameras(self):
+        # remove the highlighted cameras from the batch list
+        for item in self.cam_list.selectedItems():
+            self.cam_list.takeItem(self.cam_list.row(item))
+
+    def output_dir_browse(self):
+        output_dir = QtWidgets.QFileDialog.getExistingDirectory(self, "Export to...")
+        if output_dir:
+            self.output_dir_line_edit.setText(output_dir)
 
     def exported_file_browse(self):
-        # only .fbx files can be exported
+        # only .fbx and .camchan files can be exported
         exported_file = QtWidgets.QFileDialog.getSaveFileName(
-            self, "Save as...", None, "FBX Files (*.fbx)")
+            self, "Save as...", None, "FBX Files (*.fbx);;Camera Channels (*.camchan)")
 
         # try to set save path input, throw error if invalid
         try:
@@ -173,9 +626,12 @@ class ExportFBXCameraDialog(QtWidgets.QDialog):
             QtWidgets.QMessageBox.critical(get_maya_window(
             ), "File error", "Path input was invalid, select a valid filepath")
 
-    def close(self):
-        # close dialog
-        super(ExportFBXCameraDialog, self).close()
+    def closeEvent(self, event):
+        # stop a running export when the dialog is closed, by the cancel
+        # button or the window's close button
+        if self.runner.running:
+            self.runner.cancel()
+        super(ExportFBXCameraDialog, self).closeEvent(event)
 
     def get_selected_object(self):
 
@@ -194,25 +650,12 @@ class ExportFBXCameraDialog(QtWidgets.QDialog):
                 get_maya_window(), "Selection Error", "Please select a single camera or transform with a camera shape")
             return
 
-        # get selected object
-        selected = selected_list[0]
-
-        camera_shape = None
-
-        # from the selected object, get the top level transform
-        transform = selected.getParent() if (
-            selected.getParent() is not None) else selected
-
-        # get the first camera shape child of the transform if it exists
-        child_list = transform.getChildren()
-        for child in child_list:
-            if(pymel.core.objectType(child, isType='camera')):
-                camera_shape = child
-                break
+        # get the camera transform of the selected object from the camera registry
+        transform = get_camera_transform(selected_list[0])
 
         # if a camera shape child exists, assign its transform name as the camera input.
         # if no camera shape exists, throw error
-        if camera_shape is None:
+        if transform is None:
             QtWidgets.QMessageBox.critical(get_maya_window(
             ), "Node Type Error", "Selected Item was neither a camera or a transform with a camera shape.")
 
@@ -221,6 +664,10 @@ class ExportFBXCameraDialog(QtWidgets.QDialog):
 
     def export_camera(self):
 
+        if self.batch_check.isChecked():
+            self.export_camera_batch()
+            return
+
         # Throw error if either camera or save path inputs are not filled
         if not self.cam_line_edit.text() or not self.exported_file_line_edit.text():
             QtWidgets.QMessageBox.critical(
@@ -230,9 +677,82 @@ class ExportFBXCameraDialog(QtWidgets.QDialog):
         cam_name = self.cam_line_edit.text()
         exported_file = self.exported_file_line_edit.text()
 
-        # export camera
-        export_selected_cam_anim(cam_name, exported_file)
+        # the camera may have been deleted or renamed since it was chosen
+        if get_camera_transform(cam_name) is None:
+            QtWidgets.QMessageBox.critical(
+                get_maya_window(), "Node Type Error", "{} is not a camera in the scene".format(cam_name))
+            return
+
+        # export camera, the progress widget reports the result and its size
+        options = self.export_options()
+
+        if self.channels_check.isChecked():
+            exported_file = channels_file_name(exported_file)
+
+            def export(camera):
+                export_camera_channels(camera, exported_file, **options)
+                self.exported_files.append(exported_file)
+
+            self.start_export([cam_name], export)
+            return
+
+        configure_fbx_camera_export(**options)
+
+        def export(camera):
+            pymel.core.select(camera, r=True)
+            export_fbx_cam_anim(exported_file, configure=False, camera=camera, **options)
+            self.exported_files.append(exported_file)
+
+        self.start_export([cam_name], export)
+
+    def export_camera_batch(self):
+
+        cameras = [self.cam_list.item(i).text() for i in range(self.cam_list.count())]
+        output_dir = self.output_dir_line_edit.text()
+        name_template = self.template_line_edit.text() or NAME_TEMPLATE
+
+        # Throw error if there are no cameras or no output folder
+        if not cameras or not output_dir:
+            QtWidgets.QMessageBox.critical(
+                get_maya_window(), "Input Error", "Please add cameras and choose an output folder")
+            return
+
+        if not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+
+        options = self.export_options()
+
+        if self.channels_check.isChecked():
+            def export(camera):
+                filename = os.path.join(output_dir, camera_file_name(camera, cameras.index(camera), name_template))
+                filename = channels_file_name(filename.replace("\\", "/"))
+                export_camera_channels(camera, filename, **options)
+                self.exported_files.append(filename)
+
+            self.start_export(cameras, export)
+            return
+
+        # the fbx exporter is configured once for the whole batch
+        configure_fbx_camera_export(**options)
+
+        def export(camera):
+            self.exported_files.append(export_camera_to_dir(
+                camera, output_dir, cameras.index(camera), name_template, **options))
+
+        self.start_export(cameras, export)
+
+    def start_export(self, cameras, export):
+        # export each camera from the event loop, one per tick
+        self.exported_files = []
+        self.saved_selection = pymel.core.selected()
+        self.run_btn.setEnabled(False)
+        self.runner.run_in_process(cameras, export)
+
+    def export_finished(self, results):
+        # put back what the user had selected and report the exported size
+        pymel.core.select(self.saved_selection, r=True)
+        self.run_btn.setEnabled(True)
 
-        # clear inputs and close dialog
-        self.clear_text()
-        self.close()
+        total_size = sum(os.path.getsize(f) for f in self.exported_files if os.path.exists(f))
+        self.progress_widget.status_text.setText("{}, {:.1f} KB written".format(
+            self.progress_widget.status_text.text(), total_size / 1024.0))
@@ -0,0 +1,135 @@
+'''
+Lazily loaded tool menu for the Maya menu bar.
+
+build_menu() reads tool_manifest.json and adds one menu item per tool.
+Only maya.cmds is imported at startup: a tool's module (and with it
+PySide2, pymel and its dialog) is imported the first time its menu item
+is clicked.
+
+A manifest tool entry:
+
+{
+    "name": "camera_export",
+    "label": "Export Camera as FBX...",
+    "command": "fbx_export_camera_UI:ExportFBXCameraDialog.show_dialog",
+    "annotation": "Export cameras to FBX files"
+}
+
+command is module:attribute, the attribute is called with no arguments.
+
+The time spent reading the manifest, the time each tool adds to startup
+(creating its menu item) and the time each tool's first use spends
+importing it are recorded in TIMINGS. A one line summary is printed
+once the menu is built, and the menu's Startup Report item prints them
+all (see report()).
+'''
+
+import functools
+import importlib
+import json
+import os
+import timeit
+
+import maya.cmds
+
+
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tool_manifest.json')
+
+# seconds spent in userSetup, reading the manifest, building the whole menu,
+# creating each tool's menu item and importing each tool on its first use
+TIMINGS = {'setup': 0.0, 'manifest': 0.0, 'menu': 0.0, 'tools': {}, 'first_use': {}}
+
+
+def load_manifest(manifest_path=MANIFEST_PATH):
+    ''' Returns the tool manifest stored in the JSON file at manifest_path '''
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+def resolve_command(command):
+    '''
+    Imports the module of command and returns the function it names
+
+        Parameter:
+            command (string): module:attribute, e.g. module:Class.method
+    '''
+    module_name, attribute = command.split(':')
+    result = importlib.import_module(module_name)
+
+    for name in attribute.split('.'):
+        result = getattr(result, name)
+
+    return result
+
+
+def run_tool(tool, *args):
+    '''
+    Runs the command of a manifest tool entry, timing the import on first use.
+    Maya passes menu item commands extra arguments, they are ignored.
+    '''
+    if tool['name'] in TIMINGS['first_use']:
+        function = resolve_command(tool['command'])
+    else:
+        start = timeit.default_timer()
+        function = resolve_command(tool['command'])
+        TIMINGS['first_use'][tool['name']] = timeit.default_timer() - start
+
+    function()
+
+
+def build_menu(manifest_path=MANIFEST_PATH):
+    '''
+    Adds the menu described by the manifest at manifest_path to the Maya menu bar,
+    replacing it if it already exists, and prints how long it took
+    '''
+    menu_start = timeit.default_timer()
+    manifest = load_manifest(manifest_path)
+    TIMINGS['manifest'] = timeit.default_timer() - menu_start
+
+    menu_name = manifest['menu']['name']
+    if maya.cmds.menu(menu_name, exists=True):
+        maya.cmds.deleteUI(menu_name)
+
+    maya.cmds.menu(menu_name, label=manifest['menu']['label'], parent='MayaWindow', tearOff=True)
+
+    for tool in manifest['tools']:
+        start = timeit.default_timer()
+        maya.cmds.menuItem(parent=menu_name,
+                           label=tool['label'],
+                           command=functools.partial(run_tool, tool),
+                           annotation=tool.get('annotation', ''))
+        TIMINGS['tools'][tool['name']] = timeit.default_timer() - start
+
+    maya.cmds.menuItem(parent=menu_name, divider=True)
+    maya.cmds.menuItem(parent=menu_name,
+                       label='Startup Report',
+                       command=lambda *args: report(),
+                       annotation='Print the time each tool added to startup')
+
+    TIMINGS['menu'] = timeit.default_timer() - menu_start
+
+    print('{}: {} tools registered, {:.1f} ms added to startup'.format(
+        manifest['menu']['label'], len(manifest['tools']), startup_seconds() * 1000.0))
+
+
+def startup_seconds():
+    ''' Returns the seconds userSetup and build_menu() added to startup '''
+    return TIMINGS['setup'] + TIMINGS['menu']
+
+
+def report():
+    ''' Prints the recorded startup and first use times, in milliseconds '''
+    lines = ['Tool startup report (ms)',
+             '{:<24}{:>10.2f}'.format('userSetup', TIMINGS['setup'] * 1000.0),
+             '{:<24}{:>10.2f}'.format('manifest', TIMINGS['manifest'] * 1000.0),
+             '{:<24}{:>10}{:>12}'.format('tool', 'startup', 'first use')]
+
+    for name, seconds in sorted(TIMINGS['tools'].items()):
+        first_use = TIMINGS['first_use'].get(name)
+        first_use = '{:.2f}'.format(first_use * 1000.0) if first_use is not None else 'not used'
+        lines.append('{:<24}{:>10.2f}{:>12}'.format(name, seconds * 1000.0, first_use))
+
+    lines.append('{:<24}{:>10.2f}'.format('total', startup_seconds() * 1000.0))
+    print('\n'.join(lines))
+
+    return lines
@@ -1,36 +1,20 @@
 '''
 Krysten Tachiyama
 
-This user setup adds a dropdown menu to the Maya menu bar. Clicking on
-the menu calls the ktachiyama_fbx_export_camera file and instantiates a UI.
+This user setup adds a dropdown menu of the animation tools to the Maya
+menu bar. The menu is built from tool_manifest.json by tool_menu, and
+each tool is only imported the first time its menu item is clicked.
 '''
 
-import sys
-import inspect
-import maya.OpenMayaUI
+import timeit
 
+setup_start = timeit.default_timer()
 
-def create_custom_menu():
+import maya.cmds
+import tool_menu
 
-    # setup menu
-    menu_name = "fbx_export_camera"
+tool_menu.TIMINGS['setup'] = timeit.default_timer() - setup_start
 
-    maya.cmds.menu(menu_name, label="Export Camera as FBX",
-                   parent="MayaWindow", tearOff=True)
-
-    maya.cmds.menuItem(parent=menu_name, divider=True)
-
-    maya.cmds.menuItem(parent=menu_name,
-                       label="Export Camera as FBX",
-                       command=export_camera,
-                       annotation="Export camera to FBX file")
-
-
-def export_camera(*args):
-
-    # import file into Maya and instantiate UI
-    import fbx_export_camera_UI
-    fbx_export_camera_UI.ExportFBXCameraDialog.show_dialog()
-
-
-maya.cmds.evalDeferred("create_custom_menu()")
+# mayapy and batch workers have no menu bar
+if not maya.cmds.about(batch=True):
+    maya.cmds.evalDeferred(tool_menu.build_menu)
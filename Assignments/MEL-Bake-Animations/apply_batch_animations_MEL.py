@@ -6,11 +6,36 @@ This script bakes an animation onto a given skeleton rig.
 To run, input the paths (directory including file name) of 
 the animation and rig as well as the path to where you want
 the new scene to be saved. Then execute the code in Maya.
+
+Make sure joint_mapping and, from Assignments/Shared, file_discovery and
+key_reduction are added to your Maya scripts with this file.
 '''
 
 import pymel.core
+import hashlib
+import json
 import os
 
+from file_discovery import discover_files
+from joint_mapping import load_retarget_map, match_joints
+
+# Options passed to bakeResults. They are part of the bake cache key, so
+# changing any of them invalidates every previously baked clip.
+BAKE_OPTIONS = {'simulation': True,
+                'sampleBy': 1,
+                'oversamplingRate': 1,
+                'disableImplicitControl': True,
+                'preserveOutsideKeys': True,
+                'sparseAnimCurveBake': False,
+                'removeBakedAnimFromLayer': False,
+                'bakeOnOverrideLayer': False,
+                'minimizeRotation': True,
+                'controlPoints': False,
+                'shape': True}
+
+# Name of the bake cache manifest written to the save directory
+MANIFEST_NAME = 'bake_manifest.json'
+
 ###############  Helper Functions  ###############
 
 
@@ -45,7 +70,7 @@ def create_reference(file_path, ns):
     pymel.core.system.createReference(file_path, ns=ns)
 
 
-def connect_joints(src_list, dst_list):
+def connect_joints(src_list, dst_list, retarget_map=None):
     '''
     Makes sure that the names of the joints from src_list 
     matches with the names of the joints from dst_list.
@@ -55,21 +80,105 @@ def connect_joints(src_list, dst_list):
         Parameters:
             src_list (list of strings): List containing joint names of animation
             dst_list (list of strings): List containing joint names of rig
+            retarget_map (RetargetMap): Optional rules for renaming animation joints
+                to rig joints, see joint_mapping
    '''
-    for src_joint in src_list:
-        s = src_joint.split(":")[1]
-        for dstJoint in dst_list:
-            d = dstJoint.split(":")[1]
-            if s == d:
-                pymel.core.animation.parentConstraint(
-                    src_joint, dstJoint, mo=True)
-                break
+    for src_joint, dst_joint in match_joints(src_list, dst_list, retarget_map):
+        pymel.core.animation.parentConstraint(src_joint, dst_joint, mo=True)
+
+
+def get_bake_range(joints, handles=0):
+    '''
+    Returns the (start, end) frames spanning every key on every animated
+    channel of joints, found with one query for the first key and one for
+    the last key across all of their curves
+
+        Parameters:
+            joints (list of PyNodes): Joints whose animation is being baked
+            handles (int): Extra frames to add before the start and after the end
+    '''
+    start_time = pymel.core.findKeyframe(joints, which='first')
+    end_time = pymel.core.findKeyframe(joints, which='last')
+
+    return start_time - handles, end_time + handles
+
+
+def hash_file(file_path):
+    '''
+    Returns the sha1 hex digest of the contents of file_path
+
+        Parameter:
+            file_path (string): Path of the file to hash
+    '''
+    sha = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def bake_job_key(char_hash, anim_hash, bake_options):
+    '''
+    Returns a key identifying a bake job by the contents of the rig, the
+    contents of the animation and the bakeResults options
+
+        Parameters:
+            char_hash (string): hash_file() digest of the character rig
+            anim_hash (string): hash_file() digest of the animation
+            bake_options (dictionary): Options passed to bakeResults
+    '''
+    sha = hashlib.sha1()
+    sha.update(char_hash.encode('utf-8'))
+    sha.update(anim_hash.encode('utf-8'))
+    sha.update(json.dumps(bake_options, sort_keys=True).encode('utf-8'))
+    return sha.hexdigest()
+
+
+def load_manifest(save_dir):
+    '''
+    Returns the bake cache manifest stored in save_dir, mapping bake job
+    keys to output files. Returns an empty manifest if there is none yet
+    or if it cannot be read.
+
+        Parameter:
+            save_dir (string): Directory where the applied animations are saved
+    '''
+    manifest_path = os.path.join(save_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return dict()
+
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    except ValueError:
+        pymel.core.warning('Ignoring unreadable bake manifest: {}'.format(manifest_path))
+        return dict()
+
+
+def save_manifest(save_dir, manifest):
+    '''
+    Writes the bake cache manifest to save_dir. The manifest is written to a
+    temporary file first so an interrupted batch never leaves it half written.
+
+        Parameters:
+            save_dir (string): Directory where the applied animations are saved
+            manifest (dictionary): Bake job keys mapped to output files
+    '''
+    manifest_path = os.path.join(save_dir, MANIFEST_NAME)
+    temp_path = manifest_path + '.tmp'
+
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    os.rename(temp_path, manifest_path)
 
 
 ##############  End of Helper Functions  ###############
 
 
-def apply_animation(anim_file, char_file, save_dir):
+def apply_animation(anim_file, char_file, save_dir, retarget_map=None, reduce_keys=False, handles=0):
     '''
     Takes the animation from anim_file and applies it to the character
     rig in char_file. Then saves the applied animation to the folder save_dir
@@ -78,6 +187,11 @@ def apply_animation(anim_file, char_file, save_dir):
             anim_file (string): Path (directory and file) that contains the animation
             char_file (string): Path (directory and file) that contains the character rig is
             save_dir (string): Directory where the applied animations will be saved
+            retarget_map (RetargetMap): Optional rules for renaming animation joints
+                to rig joints, see joint_mapping
+            reduce_keys (bool): True if keys that can be rebuilt by interpolation should
+                be removed from the baked curves, see key_reduction (requires NumPy)
+            handles (int): Extra frames to bake before and after the keyed range
     '''
     # create new scene
     pymel.core.newFile(f=1)
@@ -96,32 +210,26 @@ def apply_animation(anim_file, char_file, save_dir):
     anim_joints = pymel.core.ls('{}:*'.format(anim_ns), type='joint')
     char_joints = pymel.core.ls('{}:*'.format(char_ns), type='joint')
 
-    # We want the current framerate and the referenced
-    # animation framerates to match
-    first_keyframe = pymel.core.findKeyframe(anim_joints[0], which='first')
-    pymel.core.currentTime(first_keyframe)
+    # We want the playback range to match the keyed
+    # range of every animated joint
+    start_time, end_time = get_bake_range(anim_joints, handles)
+    pymel.core.playbackOptions(animationStartTime=start_time, minTime=start_time,
+                               animationEndTime=end_time, maxTime=end_time)
+    pymel.core.currentTime(start_time)
 
     # Connect the joints of the animation & the character
-    connect_joints(anim_joints, char_joints)
+    connect_joints(anim_joints, char_joints, retarget_map)
 
     # Shake 'n Bake animation bones to character bones
-    start_time = pymel.core.playbackOptions(q=True, min=True)
-    end_time = pymel.core.playbackOptions(q=True, max=True)
 
     pymel.core.select(cl=True)
     pymel.core.select(char_joints)
-    pymel.core.bakeResults(simulation=True,
-                           time=(start_time, end_time),
-                           sampleBy=1,
-                           oversamplingRate=1,
-                           disableImplicitControl=True,
-                           preserveOutsideKeys=True,
-                           sparseAnimCurveBake=False,
-                           removeBakedAnimFromLayer=False,
-                           bakeOnOverrideLayer=False,
-                           minimizeRotation=True,
-                           controlPoints=False,
-                           shape=True)
+    pymel.core.bakeResults(time=(start_time, end_time), **BAKE_OPTIONS)
+
+    # simplify the baked curves
+    if reduce_keys:
+        from key_reduction import reduce_baked_keys
+        reduce_baked_keys([str(j) for j in char_joints])
 
     # remove animation reference
     references = pymel.core.system.getReferences()
@@ -134,13 +242,27 @@ def apply_animation(anim_file, char_file, save_dir):
     pymel.core.system.renameFile(renamed_file)
     pymel.core.system.saveFile(save=True, f=True)
 
+    return renamed_file
+
 
-def batch_animations():
+def batch_animations(use_cache=True, retarget_map_file=None, reduce_keys=False, handles=0):
     '''
     Defines the locations of the animations, character rig, and where the 
     applied animations will be saved. Then loops through the folder that 
     contains the animations and sends the animation, rig, and save directory
     to apply_animations() to be applied and saved.
+
+    If use_cache is True, clips whose rig, animation and bake options have
+    not changed since they were last baked into save_dir are skipped.
+
+    If retarget_map_file is given, animation joints are renamed through that
+    retarget map (see joint_mapping) before being matched to the rig joints.
+
+    If reduce_keys is True, redundant keys are removed from each baked clip
+    before it is saved (see key_reduction).
+
+    Each clip is baked over exactly its keyed range, plus `handles` frames
+    on each side.
     '''
     # File of character rig
     char_location = 'C:/Users/k_tac/OneDrive/Documents/LMU/ANIM-332-Programming-3D-Animation-Tools/Assignments/MEL-Bake-Animations/character.mb'
@@ -148,15 +270,46 @@ def batch_animations():
     # Location of folder containing all the animations that will be applied to the rig
     anim_location = 'C:/Users/k_tac/OneDrive/Documents/LMU/ANIM-332-Programming-3D-Animation-Tools/Assignments/MEL-Bake-Animations/animations'
 
-    anim_files = [os.path.join(anim_location, f) for f in os.listdir(
-        anim_location) if os.path.exists(os.path.join(anim_location, f))]
+    anim_files = list(discover_files(anim_location, include=['*.ma', '*.mb']))
 
     # location where the applied animations will be saved
     save_dir = 'C:/Users/k_tac/OneDrive/Documents/LMU/ANIM-332-Programming-3D-Animation-Tools/Assignments/MEL-Bake-Animations/save_here'
 
+    retarget_map = load_retarget_map(retarget_map_file) if retarget_map_file else None
+
+    if not use_cache:
+        # For each animation file in anim_files, apply the animation to the character and save
+        for a in anim_files:
+            apply_animation(a, char_location, save_dir, retarget_map, reduce_keys, handles)
+        return
+
+    manifest = load_manifest(save_dir)
+
+    # the rig is shared by every clip, so only hash it once
+    char_hash = hash_file(char_location)
+
+    # the bake range, a retarget map or key reduction changes what gets saved
+    job_options = dict(BAKE_OPTIONS, handles=handles)
+    if retarget_map_file:
+        job_options['retarget_map'] = hash_file(retarget_map_file)
+    if reduce_keys:
+        job_options['reduce_keys'] = True
+
     # For each animation file in anim_files, apply the animation to the character and save
     for a in anim_files:
-        apply_animation(a, char_location, save_dir)
+        key = bake_job_key(char_hash, hash_file(a), job_options)
+
+        # skip clips that were already baked with the same inputs
+        cached_file = manifest.get(key)
+        if cached_file and os.path.exists(cached_file):
+            print('Skipping unchanged clip: {}'.format(a))
+            continue
+
+        manifest[key] = apply_animation(a, char_location, save_dir, retarget_map, reduce_keys,
+                                        handles)
+
+        # save after every clip so an interrupted batch keeps its progress
+        save_manifest(save_dir, manifest)
 
 
 if __name__ == '__main__':
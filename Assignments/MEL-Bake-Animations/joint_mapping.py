@@ -0,0 +1,255 @@
+'''
+Joint mapping engine used to connect animation joints to rig joints.
+
+Matches joints by their short names (namespace and DAG path removed)
+through a hash index that is built once per skeleton and cached. The
+cache only holds names and list positions, never the joints themselves,
+so it stays valid after the scene holding them is closed. An
+optional retarget map lets differently named skeletons be connected.
+
+A retarget map is a JSON file of source name -> target name entries:
+
+{
+    "Hips": "pelvis",
+    "Left*": "L_*",
+    "*_end": "*_tip"
+}
+
+Entries containing * or ? are wildcard rules and are tried in file order;
+each * or ? in the target is filled with what it matched in the source.
+Every other entry is an exact rename. Joints that no entry applies to
+keep their own name.
+
+This module is pure Python so it can be tested and benchmarked outside
+of Maya. To run the benchmark:
+
+python joint_mapping.py
+'''
+
+import hashlib
+import json
+import re
+import timeit
+
+
+# Cache of skeleton signature -> {short name: position in the joint list}
+_index_cache = dict()
+
+
+###############  Helper Functions  ###############
+
+
+def short_name(joint):
+    '''
+    Returns the name of joint without its namespace or DAG path
+
+        Parameter:
+            joint (string or PyNode): Joint name, e.g. 'char:root|char:spine'
+    '''
+    return str(joint).split('|')[-1].split(':')[-1]
+
+
+def skeleton_signature(joints):
+    '''
+    Returns a hash identifying a skeleton by the full names of its joints
+
+        Parameter:
+            joints (list): Joint names or PyNodes
+    '''
+    sha = hashlib.sha1()
+    for j in joints:
+        sha.update(str(j).encode('utf-8'))
+        sha.update(b'\n')
+    return sha.hexdigest()
+
+
+def build_joint_index(joints):
+    '''
+    Returns a dictionary of short name -> joint for the given joints. The
+    name -> position index is cached by skeleton signature, so every clip
+    baked onto the same rig reuses it, and is resolved against joints on
+    every call, so the result always holds the joints passed in (e.g. the
+    PyNodes of the current scene). If two joints share a short name, the
+    first one wins.
+
+        Parameter:
+            joints (list): Joint names or PyNodes
+    '''
+    signature = skeleton_signature(joints)
+
+    positions = _index_cache.get(signature)
+    if positions is None:
+        positions = dict()
+        for i, j in enumerate(joints):
+            positions.setdefault(short_name(j), i)
+        _index_cache[signature] = positions
+
+    return dict((name, joints[i]) for name, i in positions.items())
+
+
+def clear_index_cache():
+    ''' Empties the joint index cache '''
+    _index_cache.clear()
+
+
+def wildcard_to_regex(pattern):
+    ''' Converts a wildcard pattern using * and ? into a compiled regex '''
+    parts = []
+    for c in pattern:
+        if c == '*':
+            parts.append('(.*)')
+        elif c == '?':
+            parts.append('(.)')
+        else:
+            parts.append(re.escape(c))
+    return re.compile('^{}$'.format(''.join(parts)))
+
+
+##############  End of Helper Functions  ###############
+
+
+class RetargetMap(object):
+    '''
+    Source name -> target name rules for connecting differently named skeletons
+
+        Parameters:
+            entries (list of tuples): (source, target) pairs, in priority order
+    '''
+
+    def __init__(self, entries=()):
+        self.entries = list(entries)
+        self.exact = dict()
+        self.rules = []
+
+        for source, target in self.entries:
+            if '*' in source or '?' in source:
+                self.rules.append((wildcard_to_regex(source), target))
+            else:
+                self.exact.setdefault(source, target)
+
+    def target_name(self, name):
+        '''
+        Returns the target short name for the source short name, or name
+        itself if no entry applies
+        '''
+        target = self.exact.get(name)
+        if target is not None:
+            return target
+
+        for regex, target in self.rules:
+            match = regex.match(name)
+            if match:
+                groups = iter(match.groups())
+                return re.sub(r'[*?]', lambda m: next(groups, ''), target)
+
+        return name
+
+
+def load_retarget_map(file_path):
+    '''
+    Reads a retarget map from a JSON file
+
+        Parameter:
+            file_path (string): Path of the retarget map file
+
+        Returns:
+            A RetargetMap
+    '''
+    with open(file_path, 'r') as f:
+        # keep entries in file order so wildcard rules have a fixed priority
+        entries = json.load(f, object_pairs_hook=list)
+
+    return RetargetMap(entries)
+
+
+def save_retarget_map(file_path, retarget_map):
+    '''
+    Writes a retarget map to a JSON file, e.g. to persist a mapping built
+    from match_joints() so it can be edited and reused
+
+        Parameters:
+            file_path (string): Path of the retarget map file
+            retarget_map (RetargetMap or list of tuples): Entries to write
+    '''
+    entries = retarget_map.entries if isinstance(retarget_map, RetargetMap) else retarget_map
+
+    lines = ['    {}: {}'.format(json.dumps(s), json.dumps(t)) for s, t in entries]
+    with open(file_path, 'w') as f:
+        f.write('{\n' + ',\n'.join(lines) + '\n}\n')
+
+
+def match_joints(src_joints, dst_joints, retarget_map=None):
+    '''
+    Pairs each source joint with the destination joint of the same short name,
+    after renaming it through retarget_map if one is given.
+
+        Parameters:
+            src_joints (list): Joint names or PyNodes of the animation
+            dst_joints (list): Joint names or PyNodes of the rig
+            retarget_map (RetargetMap): Optional source -> target name rules
+
+        Returns:
+            A list of (source joint, destination joint) pairs
+    '''
+    dst_index = build_joint_index(dst_joints)
+
+    pairs = []
+    for s in src_joints:
+        name = short_name(s)
+        if retarget_map is not None:
+            name = retarget_map.target_name(name)
+
+        d = dst_index.get(name)
+        if d is not None:
+            pairs.append((s, d))
+
+    return pairs
+
+
+###############  Benchmark  ###############
+
+
+def make_skeleton(namespace, joint_count):
+    ''' Returns a list of synthetic joint names under namespace '''
+    return ['{}:joint_{:04d}'.format(namespace, i) for i in range(joint_count)]
+
+
+def nested_loop_match(src_list, dst_list):
+    ''' The original connect_joints() matching, kept for comparison '''
+    pairs = []
+    for src_joint in src_list:
+        s = src_joint.split(":")[1]
+        for dstJoint in dst_list:
+            d = dstJoint.split(":")[1]
+            if s == d:
+                pairs.append((src_joint, dstJoint))
+                break
+    return pairs
+
+
+def benchmark(joint_count=500, clips=20):
+    '''
+    Times matching `clips` animations onto one rig of joint_count joints with
+    the original nested loop and with the cached index, and prints the results
+    '''
+    rig = make_skeleton('character', joint_count)
+    anims = [make_skeleton('anim_{:03d}'.format(i), joint_count) for i in range(clips)]
+
+    # reversed so the nested loop cannot exit early on the first joints
+    rig = list(reversed(rig))
+
+    clear_index_cache()
+    assert sorted(nested_loop_match(anims[0], rig)) == sorted(match_joints(anims[0], rig))
+
+    nested = timeit.timeit(lambda: [nested_loop_match(a, rig) for a in anims], number=1)
+
+    clear_index_cache()
+    indexed = timeit.timeit(lambda: [match_joints(a, rig) for a in anims], number=1)
+
+    print('{} joints x {} clips'.format(joint_count, clips))
+    print('  nested loop:   {:.4f}s'.format(nested))
+    print('  indexed match: {:.4f}s ({:.1f}x)'.format(indexed, nested / indexed))
+
+
+if __name__ == '__main__':
+    benchmark()
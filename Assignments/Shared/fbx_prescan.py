@@ -0,0 +1,442 @@
+'''
+Editor-free FBX pre-scan.
+
+Reads binary and ASCII FBX files without Unreal or the FBX SDK and reports
+what they contain: meshes, skeleton joints, animation stacks, the frame
+range and rate of the animation, and the material names. Binary files are
+read by seeking over every node that is not needed, so vertex and key
+data is never loaded.
+
+scan_folder() pre-scans every FBX in a folder with a process pool, so
+files can be routed to the right importer and material matches planned
+before the editor imports anything.
+
+To print what a folder contains:
+
+python fbx_prescan.py path/to/folder
+'''
+
+import json
+import multiprocessing
+import os
+import re
+import struct
+import sys
+import zlib
+
+from file_discovery import discover_files
+
+
+BINARY_MAGIC = b'Kaydara FBX Binary  \x00'
+
+# FBX time units per second
+KTIME_PER_SECOND = 46186158000
+
+# GlobalSettings TimeMode -> frames per second, 14 means CustomFrameRate
+TIME_MODE_RATES = {0: 24.0, 1: 120.0, 2: 100.0, 3: 60.0, 4: 50.0, 5: 48.0, 6: 30.0, 7: 30.0,
+                   8: 29.97, 9: 29.97, 10: 25.0, 11: 24.0, 12: 1000.0, 13: 23.976,
+                   15: 96.0, 16: 72.0, 17: 59.94, 18: 119.88}
+
+# Object node types read from the Objects section
+OBJECT_TYPES = ('Model', 'Material', 'AnimationStack', 'AnimationCurve')
+
+
+###############  Helper Functions  ###############
+
+
+def new_scan_result(file_path, fbx_format, version):
+    ''' Returns an empty pre-scan result for file_path '''
+    return {'path': file_path,
+            'format': fbx_format,
+            'version': version,
+            'kind': 'unknown',
+            'has_animation': False,
+            'meshes': [],
+            'joints': [],
+            'animation_stacks': [],
+            'animation_curves': 0,
+            'frame_rate': None,
+            'frame_range': None,
+            'materials': [],
+            'error': None}
+
+
+def add_object(result, node_type, name, sub_type):
+    ''' Adds an object read from the Objects section to result '''
+    if node_type == 'Model':
+        if sub_type == 'LimbNode' or sub_type == 'Root':
+            result['joints'].append(name)
+        elif sub_type == 'Mesh':
+            result['meshes'].append(name)
+    elif node_type == 'Material':
+        result['materials'].append(name)
+    elif node_type == 'AnimationStack':
+        result['animation_stacks'].append({'name': name})
+    elif node_type == 'AnimationCurve':
+        result['animation_curves'] += 1
+
+
+def finish_scan_result(result, time_mode, custom_frame_rate):
+    ''' Fills in the frame rate, frame range and kind of a pre-scan result '''
+    rate = TIME_MODE_RATES.get(time_mode)
+    if time_mode == 14 and custom_frame_rate:
+        rate = custom_frame_rate
+    result['frame_rate'] = rate
+
+    # frame range of every animation stack, the first one is the file's range
+    for stack in result['animation_stacks']:
+        start = stack.pop('start', None)
+        stop = stack.pop('stop', None)
+        stack['frame_range'] = None
+        if start is not None and stop is not None and rate:
+            stack['frame_range'] = (int(round(start * rate / KTIME_PER_SECOND)),
+                                    int(round(stop * rate / KTIME_PER_SECOND)))
+
+    if result['animation_stacks']:
+        result['frame_range'] = result['animation_stacks'][0]['frame_range']
+
+    # an animation exported with its skinned mesh is still an animation, so
+    # importers of animations should route on has_animation, not kind
+    result['has_animation'] = bool(result['joints'] and result['animation_curves'])
+
+    if result['meshes']:
+        result['kind'] = 'skeletal_mesh' if result['joints'] else 'static_mesh'
+    elif result['has_animation']:
+        result['kind'] = 'animation'
+
+    return result
+
+
+def read_properties70(props, values):
+    '''
+    Stores the KTime, enum and number properties of a Properties70 entry in
+    values. props is the property list of one P entry: name, type, ...
+    '''
+    if len(props) >= 5 and props[0] in ('LocalStart', 'LocalStop', 'ReferenceStart',
+                                        'ReferenceStop', 'TimeMode', 'CustomFrameRate'):
+        values[props[0]] = props[4]
+
+
+def set_stack_range(stack, values):
+    ''' Stores the start and stop times read from an AnimationStack's Properties70 '''
+    stack['start'] = values.get('LocalStart', values.get('ReferenceStart'))
+    stack['stop'] = values.get('LocalStop', values.get('ReferenceStop'))
+
+
+##############  End of Helper Functions  ###############
+
+
+###############  Binary FBX  ###############
+
+
+class BinaryFbxReader(object):
+    '''
+    Reads node records from a binary FBX file. Nodes are walked by their end
+    offsets, so any node that is not read is skipped with a single seek.
+
+        Parameters:
+            f (file): FBX file opened in binary mode
+            version (int): FBX version from the header, e.g. 7400
+    '''
+
+    def __init__(self, f, version):
+        self.f = f
+        # 7.5 and later store the node header fields as 64 bit integers
+        self.header = struct.Struct('<QQQB' if version >= 7500 else '<IIIB')
+
+    def read_node(self):
+        '''
+        Reads the header of the next node and returns (name, end_offset,
+        property_count, nested_offset), or None at the null record that ends
+        a node list. The file is left at the node's first property.
+        '''
+        data = self.f.read(self.header.size)
+        if len(data) < self.header.size:
+            return None
+
+        end_offset, property_count, property_bytes, name_length = self.header.unpack(data)
+        if end_offset == 0:
+            return None
+
+        name = self.f.read(name_length).decode('utf-8', 'replace')
+        return name, end_offset, property_count, self.f.tell() + property_bytes
+
+    def read_properties(self, property_count, max_count=None):
+        ''' Reads up to max_count properties of the node the file is positioned in '''
+        props = []
+        if max_count is not None:
+            property_count = min(property_count, max_count)
+
+        for _ in range(property_count):
+            code = self.f.read(1)
+            if code in (b'S', b'R'):
+                length = struct.unpack('<I', self.f.read(4))[0]
+                value = self.f.read(length)
+                props.append(value.decode('utf-8', 'replace') if code == b'S' else value)
+            elif code in SCALAR_FORMATS:
+                fmt = SCALAR_FORMATS[code]
+                props.append(struct.unpack(fmt, self.f.read(struct.calcsize(fmt)))[0])
+            elif code in ARRAY_FORMATS:
+                length, encoding, compressed_length = struct.unpack('<III', self.f.read(12))
+                data = self.f.read(compressed_length)
+                if encoding == 1:
+                    data = zlib.decompress(data)
+                props.append(struct.unpack('<{}{}'.format(length, ARRAY_FORMATS[code]), data))
+            else:
+                raise ValueError('Unknown FBX property type: {!r}'.format(code))
+
+        return props
+
+    def children(self, start, end):
+        '''
+        Yields (name, end_offset, property_count, nested_offset) for each node
+        stored between start and end. Each node is skipped to its end once the
+        caller is done with it.
+        '''
+        position = start
+        while position < end:
+            self.f.seek(position)
+            node = self.read_node()
+            if node is None:
+                return
+
+            yield node
+            position = node[1]
+
+    def nested(self, node):
+        ''' Yields the children of node, see children() '''
+        return self.children(node[3], node[1])
+
+
+# Property type codes -> struct formats
+SCALAR_FORMATS = {b'Y': '<h', b'C': '<?', b'I': '<i', b'F': '<f', b'D': '<d', b'L': '<q'}
+ARRAY_FORMATS = {b'f': 'f', b'd': 'd', b'l': 'q', b'i': 'i', b'b': '?'}
+
+
+def split_binary_name(value):
+    ''' Returns the name of a binary FBX object name 'name\\x00\\x01Class' '''
+    return value.split('\x00\x01')[0]
+
+
+def read_properties70_binary(reader, node, values):
+    ''' Reads the P entries of node's Properties70 child into values '''
+    for child in reader.nested(node):
+        if child[0] == 'Properties70':
+            for p in reader.nested(child):
+                read_properties70(reader.read_properties(p[2]), values)
+
+
+def scan_binary(file_path, f):
+    ''' Pre-scans an open binary FBX file '''
+    f.seek(len(BINARY_MAGIC) + 2)
+    version = struct.unpack('<I', f.read(4))[0]
+    result = new_scan_result(file_path, 'binary', version)
+    reader = BinaryFbxReader(f, version)
+    settings = dict()
+
+    f.seek(0, os.SEEK_END)
+    file_end = f.tell()
+
+    for node in reader.children(len(BINARY_MAGIC) + 6, file_end):
+        if node[0] == 'GlobalSettings':
+            read_properties70_binary(reader, node, settings)
+
+        elif node[0] == 'Objects':
+            for child in reader.nested(node):
+                if child[0] not in OBJECT_TYPES:
+                    continue
+
+                # id, "name\x00\x01Class", sub type
+                props = reader.read_properties(child[2], max_count=3)
+                object_name = split_binary_name(props[1]) if len(props) > 1 else ''
+                sub_type = props[2] if len(props) > 2 else ''
+                add_object(result, child[0], object_name, sub_type)
+
+                if child[0] == 'AnimationStack':
+                    values = dict()
+                    read_properties70_binary(reader, child, values)
+                    set_stack_range(result['animation_stacks'][-1], values)
+
+    return finish_scan_result(result, settings.get('TimeMode'), settings.get('CustomFrameRate'))
+
+
+###############  ASCII FBX  ###############
+
+
+NODE_START = re.compile(r'^\s*(\w+):(.*)\{\s*$')
+NODE_END = re.compile(r'^\s*\}')
+OBJECT_LINE = re.compile(r'^\s*\d*,?\s*"\w+::([^"]*)",\s*"([^"]*)"')
+PROPERTY_LINE = re.compile(r'^\s*P:\s*(.*)$')
+VERSION_LINE = re.compile(r'^;\s*FBX\s+(\d+)\.(\d+)\.(\d+)')
+
+
+def parse_ascii_values(text):
+    ''' Splits the comma separated values of an ASCII property line '''
+    values = []
+    for v in re.findall(r'"[^"]*"|[^,]+', text):
+        v = v.strip()
+        if v.startswith('"'):
+            values.append(v.strip('"'))
+        else:
+            try:
+                values.append(int(v))
+            except ValueError:
+                try:
+                    values.append(float(v))
+                except ValueError:
+                    values.append(v)
+    return values
+
+
+def scan_ascii(file_path, f):
+    ''' Pre-scans an open ASCII FBX file, one line at a time '''
+    result = new_scan_result(file_path, 'ascii', None)
+    settings = dict()
+    stack_values = None
+    nodes = []
+
+    for raw in f:
+        line = raw.decode('utf-8', 'replace')
+
+        if not nodes:
+            version = VERSION_LINE.match(line)
+            if version:
+                major, minor, patch = [int(v) for v in version.groups()]
+                result['version'] = major * 1000 + minor * 100 + patch * 10
+
+        start = NODE_START.match(line)
+        if start:
+            name, rest = start.groups()
+
+            if len(nodes) == 1 and nodes[0] == 'Objects' and name in OBJECT_TYPES:
+                obj = OBJECT_LINE.match(rest)
+                if obj:
+                    add_object(result, name, obj.group(1), obj.group(2))
+                    if name == 'AnimationStack':
+                        stack_values = dict()
+
+            nodes.append(name)
+            continue
+
+        if NODE_END.match(line):
+            name = nodes.pop() if nodes else None
+            if name == 'AnimationStack' and stack_values is not None:
+                set_stack_range(result['animation_stacks'][-1], stack_values)
+                stack_values = None
+            continue
+
+        prop = PROPERTY_LINE.match(line)
+        if prop and nodes and nodes[-1] == 'Properties70':
+            if nodes[0] == 'GlobalSettings':
+                read_properties70(parse_ascii_values(prop.group(1)), settings)
+            elif stack_values is not None and 'AnimationStack' in nodes:
+                read_properties70(parse_ascii_values(prop.group(1)), stack_values)
+
+    return finish_scan_result(result, settings.get('TimeMode'), settings.get('CustomFrameRate'))
+
+
+##############  Scanning  ###############
+
+
+def scan_fbx(file_path):
+    '''
+    Pre-scans a binary or ASCII FBX file
+
+        Parameter:
+            file_path (string): Path of the FBX file
+
+        Returns:
+            A dictionary with the file's format and version, its kind ('static_mesh',
+            'skeletal_mesh', 'animation' or 'unknown'), its meshes, joints, animation
+            stacks, frame rate, frame range and material names. If the file cannot
+            be read, 'error' holds the reason.
+    '''
+    try:
+        with open(file_path, 'rb') as f:
+            if f.read(len(BINARY_MAGIC)) == BINARY_MAGIC:
+                return scan_binary(file_path, f)
+
+            f.seek(0)
+            return scan_ascii(file_path, f)
+
+    except Exception as e:
+        result = new_scan_result(file_path, None, None)
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+        return result
+
+
+def pool_python_executable():
+    '''
+    Returns the Python interpreter used for worker processes. Inside the Unreal
+    editor sys.executable is the editor itself, so the bundled python is used.
+    '''
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+
+    for name in ('python.exe', os.path.join('bin', 'python3'), os.path.join('bin', 'python')):
+        candidate = os.path.join(sys.exec_prefix, name)
+        if os.path.exists(candidate):
+            return candidate
+
+    return sys.executable
+
+
+def scan_files(file_paths, processes=None):
+    '''
+    Pre-scans file_paths in a pool of worker processes
+
+        Parameters:
+            file_paths (list of strings): FBX files to scan
+            processes (int): Number of worker processes, defaults to the number of cores.
+                1 scans in the current process
+
+        Returns:
+            A list of scan_fbx() results, in the same order as file_paths
+    '''
+    file_paths = list(file_paths)
+    if processes == 1 or len(file_paths) < 2:
+        return [scan_fbx(p) for p in file_paths]
+
+    context = multiprocessing.get_context('spawn')
+    context.set_executable(pool_python_executable())
+
+    pool = context.Pool(processes)
+    try:
+        return pool.map(scan_fbx, file_paths, chunksize=8)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def scan_folder(folder_path, recursive=False, processes=None):
+    ''' Pre-scans every FBX file in folder_path, see scan_files() '''
+    return scan_files(discover_files(folder_path, include=['*.fbx'], recursive=recursive), processes)
+
+
+def route_files(file_paths, kinds=None, processes=None, has_animation=None):
+    '''
+    Pre-scans file_paths and splits them by whether their kind is in kinds
+    and whether they hold skeleton animation
+
+        Parameters:
+            file_paths (list of strings): FBX files to scan
+            kinds (list of strings): Kinds to keep, e.g. ['static_mesh'], None for any kind
+            processes (int): Number of worker processes, see scan_files()
+            has_animation (bool): True to keep only files with skeleton animation,
+                whatever else they hold, False for files without, None for both
+
+        Returns:
+            (matching, skipped), two lists of scan_fbx() results
+    '''
+    matching = []
+    skipped = []
+    for r in scan_files(file_paths, processes):
+        keep = ((kinds is None or r['kind'] in kinds) and
+                (has_animation is None or r['has_animation'] == has_animation))
+        (matching if keep else skipped).append(r)
+    return matching, skipped
+
+
+if __name__ == '__main__':
+    for r in scan_folder(sys.argv[1], recursive=True):
+        print(json.dumps(r, sort_keys=True))
@@ -0,0 +1,175 @@
+'''
+Shared file discovery for the Maya and Unreal tools.
+
+discover_files() walks a folder (and optionally its sub folders) with
+os.scandir and lazily yields the paths of the files that match a set of
+glob include and exclude filters. Given an index_path, it only yields
+files that are new or have changed size or modification time since the
+last scan, and stores the index on disk for the next one.
+
+Make sure this file is added to your Maya scripts folder and to your
+Unreal project's Python folder so the other tools can import it.
+'''
+
+import fnmatch
+import json
+import os
+
+try:
+    from os import scandir
+except ImportError:
+    # Python 2 (Maya 2020 and earlier) needs the scandir backport
+    from scandir import scandir
+
+
+###############  Helper Functions  ###############
+
+
+def matches_any(rel_path, name, patterns):
+    '''
+    Returns True if the relative path or the file name matches one of the
+    glob patterns. Matching is case-insensitive, so '*.fbx' matches 'A.FBX'.
+
+        Parameters:
+            rel_path (string): Path relative to the scanned folder, using '/'
+            name (string): File or folder name
+            patterns (list of strings): Glob patterns, e.g. ['*.ma', 'shots/*/*.ma']
+    '''
+    rel_path = rel_path.lower()
+    name = name.lower()
+    for p in patterns:
+        p = p.lower()
+        if fnmatch.fnmatchcase(name, p) or fnmatch.fnmatchcase(rel_path, p):
+            return True
+    return False
+
+
+def load_index(index_path):
+    ''' Returns the {path: [mtime, size]} index stored at index_path, or an empty one '''
+    if not index_path or not os.path.exists(index_path):
+        return dict()
+
+    try:
+        with open(index_path, 'r') as f:
+            return json.load(f)
+    except ValueError:
+        return dict()
+
+
+def save_index(index_path, index):
+    ''' Writes the {path: [mtime, size]} index to index_path '''
+    temp_path = index_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(index, f)
+
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    os.rename(temp_path, index_path)
+
+
+##############  End of Helper Functions  ###############
+
+
+def walk_files(folder_path, include=('*',), exclude=(), recursive=True):
+    '''
+    Lazily yields the os.DirEntry of every file under folder_path that matches
+    one of the include patterns and none of the exclude patterns. Folders that
+    match an exclude pattern are not walked into.
+
+        Parameters:
+            folder_path (string): Folder to scan
+            include (list of strings): Glob patterns of the files to yield
+            exclude (list of strings): Glob patterns of the files and folders to skip
+            recursive (bool): True to also scan sub folders
+    '''
+    # stack of (folder, path of folder relative to folder_path)
+    folders = [(folder_path, '')]
+
+    while folders:
+        folder, rel_folder = folders.pop()
+
+        try:
+            entries = scandir(folder)
+        except OSError:
+            continue
+
+        # the folder's handle is closed even when the caller stops early.
+        # scandir iterators before Python 3.6 have no close(), they close
+        # once exhausted or garbage collected
+        sub_folders = []
+        try:
+            for entry in entries:
+                rel_path = rel_folder + entry.name
+
+                if exclude and matches_any(rel_path, entry.name, exclude):
+                    continue
+
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        sub_folders.append((entry.path, rel_path + '/'))
+
+                elif entry.is_file() and matches_any(rel_path, entry.name, include):
+                    yield entry
+        finally:
+            if hasattr(entries, 'close'):
+                entries.close()
+
+        # walk sub folders in name order, depth first
+        folders.extend(sorted(sub_folders, reverse=True))
+
+
+def discover_files(folder_path, include=('*',), exclude=(), recursive=True, index_path=None):
+    '''
+    Lazily yields the paths of the files under folder_path that match one of
+    the include patterns and none of the exclude patterns.
+
+    If index_path is given, only files that are new or whose size or
+    modification time changed since the last scan with the same index are
+    yielded, and the index is updated on disk once the scan stops.
+
+        Parameters:
+            folder_path (string): Folder to scan
+            include (list of strings): Glob patterns of the files to yield, e.g. ['*.fbx']
+            exclude (list of strings): Glob patterns of the files and folders to skip
+            recursive (bool): True to also scan sub folders
+            index_path (string): Optional path of the mtime/size index file
+    '''
+    entries = walk_files(folder_path, include, exclude, recursive)
+
+    if index_path is None:
+        try:
+            for entry in entries:
+                yield entry.path
+        finally:
+            entries.close()
+        return
+
+    index = load_index(index_path)
+    seen = set()
+    finished = False
+
+    try:
+        for entry in entries:
+            stat = entry.stat()
+            signature = [stat.st_mtime, stat.st_size]
+            seen.add(entry.path)
+
+            if index.get(entry.path) != signature:
+                yield entry.path
+
+                # only record the file once the caller has taken it
+                index[entry.path] = signature
+
+        finished = True
+
+    finally:
+        entries.close()
+
+        # forget files that were deleted, but only after a complete scan
+        if finished:
+            prefix = os.path.join(folder_path, '')
+            for path in list(index):
+                if path.startswith(prefix) and path not in seen:
+                    del index[path]
+
+        save_index(index_path, index)
@@ -0,0 +1,71 @@
+'''
+Shared import option templates for the Unreal importers.
+
+Building an FbxImportUI takes a couple dozen set_editor_property calls.
+ImportOptionTemplates builds the options once for each distinct
+combination of settings (e.g. skeleton, mesh or animation, materials on
+or off) and hands the same object to every import task in the batch.
+A per-file override hook can still swap in different options for
+specific files.
+
+This module does not import unreal, so it can be tested with a fake
+unreal module.
+'''
+
+
+def setting_key(value):
+    '''
+    Returns a hashable key for a setting. Unreal objects such as skeletons
+    are keyed by their path name.
+    '''
+    get_path_name = getattr(value, 'get_path_name', None)
+    if get_path_name is not None:
+        return get_path_name()
+    return value
+
+
+class ImportOptionTemplates(object):
+    '''
+    Cache of import options, built once per kind and combination of settings.
+    Create one per import batch.
+    '''
+
+    def __init__(self):
+        self.templates = dict()
+        self.builds = 0
+
+    def get(self, kind, build, **settings):
+        '''
+        Returns the cached options for kind and settings, calling
+        build(**settings) the first time they are asked for
+
+            Parameters:
+                kind (string): Name of the kind of options, e.g. 'anim' or 'static_mesh'
+                build (function): Builds a new options object from settings
+                settings: Keyword arguments passed on to build
+        '''
+        key = (kind,) + tuple(sorted((name, setting_key(value)) for name, value in settings.items()))
+
+        options = self.templates.get(key)
+        if options is None:
+            options = build(**settings)
+            self.templates[key] = options
+            self.builds += 1
+
+        return options
+
+    def options_for(self, input_path, kind, build, override=None, **settings):
+        '''
+        Returns the options to import input_path with. If override is given it
+        is called as override(input_path, template_options) and may return new
+        options for that file, or None to use the shared template. The
+        template itself is shared by every file and must not be modified.
+        '''
+        template = self.get(kind, build, **settings)
+
+        if override is not None:
+            options = override(input_path, template)
+            if options is not None:
+                return options
+
+        return template
@@ -0,0 +1,289 @@
+'''
+Non-blocking job runner for the Qt tool dialogs.
+
+JobRunner works through a list of items and reports on it with Qt
+signals: the progress after every item (done, total, items per second
+and the estimated seconds left), each item's result, and the list of
+every result at the end. Cancelling is cooperative and takes effect
+between items.
+
+Work is run one of two ways:
+
+- run_process() starts an out-of-process worker (e.g. mayapy) with
+  QProcess and reads one result line per item from its stdout, so the
+  UI thread only handles output events. The job sent to the worker gets
+  a cancel_file path; the worker should stop before its next item once
+  that file exists.
+- run_in_process() calls a function on each item from the Qt event
+  loop, one item per timer tick, for work that has to happen in the
+  open Maya scene. The UI redraws and the cancel button works between
+  items.
+
+JobProgressWidget shows a runner's progress bar, throughput, ETA, a
+cancel button and the list of results.
+'''
+
+import json
+import os
+import tempfile
+import timeit
+
+from PySide2 import QtCore, QtWidgets
+
+
+class JobRunner(QtCore.QObject):
+    '''
+    Runs a job over a list of items, one at a time, without blocking the Qt event loop
+
+    Signals:
+        started(int): Number of items
+        progress(int, int, float, float): Items done, number of items, items per second,
+            estimated seconds left
+        item_finished(dict): Result of an item, {'item', 'success', 'error'}
+        finished(list): Every result in item order, including the failed and cancelled items
+    '''
+
+    started = QtCore.Signal(int)
+    progress = QtCore.Signal(int, int, float, float)
+    item_finished = QtCore.Signal(dict)
+    finished = QtCore.Signal(list)
+
+    def __init__(self, parent=None):
+        super(JobRunner, self).__init__(parent)
+        self.items = []
+        self.results = dict()
+        self.cancelled = False
+        self.running = False
+        self.start_time = 0.0
+
+        self.process = None
+        self.result_prefix = None
+        self.item_key = 'item'
+        self.output_buffer = ''
+        self.cancel_file = None
+
+        self.work = None
+        self.next_index = 0
+
+    ###############  Running  ###############
+
+    def run_in_process(self, items, work):
+        '''
+        Calls work(item) on each item from the event loop. work can raise to
+        mark an item as failed.
+
+            Parameters:
+                items (list): Items to work through, reported with str(item)
+                work (function): Called with each item
+        '''
+        self.begin(items)
+        self.work = work
+        self.next_index = 0
+        QtCore.QTimer.singleShot(0, self.run_next_item)
+
+    def run_process(self, command, job, items, result_prefix, item_key='item'):
+        '''
+        Starts command as a worker process and sends it job as JSON on stdin
+
+            Parameters:
+                command (list of strings): Program and arguments of the worker
+                job (dictionary): Job for the worker, a 'cancel_file' path is added to it
+                items (list of strings): Items the worker works through, in order
+                result_prefix (string): Prefix of the stdout lines holding a JSON result
+                item_key (string): Key of the item in the worker's results
+        '''
+        self.begin(items)
+        self.result_prefix = result_prefix
+        self.item_key = item_key
+        self.output_buffer = ''
+
+        handle, self.cancel_file = tempfile.mkstemp(suffix='.cancel')
+        os.close(handle)
+        os.remove(self.cancel_file)
+        job = dict(job, cancel_file=self.cancel_file)
+
+        self.process = QtCore.QProcess(self)
+        self.process.readyReadStandardOutput.connect(self.read_output)
+        self.process.finished.connect(self.process_finished)
+        self.process.errorOccurred.connect(self.process_error)
+        self.process.start(command[0], command[1:])
+        self.process.write((json.dumps(job) + '\n').encode('utf-8'))
+        self.process.closeWriteChannel()
+
+    def cancel(self):
+        ''' Asks the job to stop before its next item '''
+        self.cancelled = True
+
+        if self.cancel_file:
+            with open(self.cancel_file, 'w') as f:
+                f.write('cancel')
+
+    ###############  Bookkeeping  ###############
+
+    def begin(self, items):
+        self.items = list(items)
+        self.results = dict()
+        self.cancelled = False
+        self.running = True
+        self.start_time = timeit.default_timer()
+        self.started.emit(len(self.items))
+
+    def record(self, item, success, error=None):
+        ''' Stores the result of item and reports the progress '''
+        result = {'item': str(item), 'success': success, 'error': error}
+        self.results[str(item)] = result
+        self.item_finished.emit(result)
+
+        done = len(self.results)
+        elapsed = timeit.default_timer() - self.start_time
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (len(self.items) - done) / rate if rate > 0 else 0.0
+        self.progress.emit(done, len(self.items), rate, eta)
+
+    def end(self, reason):
+        ''' Marks the items without a result as failed for reason and emits finished '''
+        if not self.running:
+            return
+        self.running = False
+
+        if self.cancel_file and os.path.exists(self.cancel_file):
+            os.remove(self.cancel_file)
+        self.cancel_file = None
+
+        results = []
+        for item in self.items:
+            results.append(self.results.get(str(item)) or
+                           {'item': str(item), 'success': False, 'error': reason})
+
+        self.finished.emit(results)
+
+    ###############  In-process work  ###############
+
+    def run_next_item(self):
+        if self.cancelled or self.next_index >= len(self.items):
+            self.end('Cancelled')
+            return
+
+        item = self.items[self.next_index]
+        self.next_index += 1
+
+        try:
+            self.work(item)
+            self.record(item, True)
+        except Exception as e:
+            self.record(item, False, str(e))
+
+        # let the UI redraw and handle a cancel before the next item
+        QtCore.QTimer.singleShot(0, self.run_next_item)
+
+    ###############  Out-of-process work  ###############
+
+    def read_output(self):
+        self.output_buffer += bytes(self.process.readAllStandardOutput()).decode('utf-8', 'replace')
+
+        lines = self.output_buffer.split('\n')
+        self.output_buffer = lines.pop()
+
+        for line in lines:
+            line = line.strip()
+            if not line.startswith(self.result_prefix):
+                continue
+
+            # a bad line must not raise inside the Qt slot, the item it was
+            # for is reported as failed when the worker finishes
+            try:
+                result = json.loads(line[len(self.result_prefix):])
+                item = result[self.item_key]
+            except (ValueError, KeyError, TypeError) as e:
+                print('Ignoring malformed worker result {!r}: {}'.format(line, e))
+                continue
+
+            self.record(item, result.get('success', False), result.get('error'))
+
+    def process_finished(self, *args):
+        self.read_output()
+        if self.cancelled:
+            self.end('Cancelled')
+        else:
+            error = bytes(self.process.readAllStandardError()).decode('utf-8', 'replace').strip()
+            self.end(error[-2000:] or 'Worker exited without a result')
+
+    def process_error(self, error):
+        if error == QtCore.QProcess.FailedToStart:
+            self.end('Could not start worker: {}'.format(self.process.errorString()))
+
+
+def format_seconds(seconds):
+    ''' Returns seconds as m:ss '''
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return '{}:{:02d}'.format(minutes, seconds)
+
+
+class JobProgressWidget(QtWidgets.QWidget):
+    '''
+    Progress bar, throughput, ETA, cancel button and result list of a JobRunner
+
+        Parameter:
+            runner (JobRunner): Runner to show
+    '''
+
+    def __init__(self, runner, parent=None):
+        super(JobProgressWidget, self).__init__(parent)
+        self.runner = runner
+
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.status_text = QtWidgets.QLabel()
+        self.cancel_btn = QtWidgets.QPushButton('Stop')
+        self.cancel_btn.setEnabled(False)
+        self.result_list = QtWidgets.QListWidget()
+
+        self.progress_layout = QtWidgets.QHBoxLayout()
+        self.progress_layout.addWidget(self.progress_bar)
+        self.progress_layout.addWidget(self.cancel_btn)
+
+        self.main_layout = QtWidgets.QVBoxLayout(self)
+        self.main_layout.setContentsMargins(0, 0, 0, 0)
+        self.main_layout.addLayout(self.progress_layout)
+        self.main_layout.addWidget(self.status_text)
+        self.main_layout.addWidget(self.result_list)
+
+        self.cancel_btn.clicked.connect(self.cancel)
+        runner.started.connect(self.job_started)
+        runner.progress.connect(self.job_progress)
+        runner.item_finished.connect(self.item_finished)
+        runner.finished.connect(self.job_finished)
+
+    def cancel(self):
+        self.runner.cancel()
+        self.cancel_btn.setEnabled(False)
+        self.status_text.setText('Stopping after the current item...')
+
+    def job_started(self, total):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(0)
+        self.result_list.clear()
+        self.status_text.setText('Starting...')
+        self.cancel_btn.setEnabled(True)
+
+    def job_progress(self, done, total, rate, eta):
+        self.progress_bar.setValue(done)
+        self.status_text.setText('{} / {} done, {:.2f} items/s, {} left'.format(
+            done, total, rate, format_seconds(eta)))
+
+    def item_finished(self, result):
+        name = os.path.basename(result['item'])
+        if result['success']:
+            self.result_list.addItem('OK      {}'.format(name))
+        else:
+            self.result_list.addItem('FAILED  {}: {}'.format(name, result['error']))
+
+    def job_finished(self, results):
+        self.cancel_btn.setEnabled(False)
+
+        # items that never ran (cancelled, or lost when a worker crashed)
+        for result in results:
+            if result['item'] not in self.runner.results:
+                self.item_finished(result)
+
+        failed = len([r for r in results if not r['success']])
+        self.status_text.setText('Finished: {} succeeded, {} failed'.format(len(results) - failed, failed))
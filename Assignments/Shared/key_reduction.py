@@ -0,0 +1,211 @@
+'''
+Post-bake key reduction for baked animation curves.
+
+bakeResults(sparseAnimCurveBake=False) writes a key on every frame of
+every channel. This module removes the keys that can be rebuilt by
+linear interpolation between their neighbours to within a per-channel
+tolerance (Ramer-Douglas-Peucker with vertical, per-frame error), and
+sets the remaining keys to linear tangents so the tolerance holds on
+every original frame.
+
+The reduction runs with NumPy on whole (channels x frames) arrays at
+once and does not need Maya, so it can be benchmarked on its own:
+
+python key_reduction.py
+
+Inside Maya, call reduce_baked_keys() on the baked joints.
+'''
+
+import timeit
+
+import numpy
+
+
+# Largest value error allowed per channel, by attribute name prefix
+DEFAULT_TOLERANCES = {'translate': 0.01,
+                      'rotate': 0.05,
+                      'scale': 0.001}
+
+# Tolerance for attributes that do not match any prefix above
+DEFAULT_TOLERANCE = 0.001
+
+
+###############  Helper Functions  ###############
+
+
+def tolerance_for_attribute(attribute, tolerances=None):
+    '''
+    Returns the tolerance for attribute, e.g. 'translateX'
+
+        Parameters:
+            attribute (string): Attribute name
+            tolerances (dictionary): Attribute name prefix -> tolerance,
+                defaults to DEFAULT_TOLERANCES
+    '''
+    if tolerances is None:
+        tolerances = DEFAULT_TOLERANCES
+
+    for prefix, tolerance in tolerances.items():
+        if attribute.startswith(prefix):
+            return tolerance
+
+    return DEFAULT_TOLERANCE
+
+
+##############  End of Helper Functions  ###############
+
+
+def reduce_channels(times, values, tolerance):
+    '''
+    Finds the keys to keep on a set of channels sampled at the same times.
+
+    Every segment between kept keys whose linear interpolation misses a
+    sample by more than the tolerance is split at its worst sample, for all
+    channels and all segments at once, until every segment is within the
+    tolerance. The first and last keys are always kept.
+
+        Parameters:
+            times (array of floats): Key times, shape (frames,)
+            values (array of floats): Key values, shape (channels, frames)
+            tolerance (float or array of floats): Largest error allowed, either
+                one value for all channels or one per channel
+
+        Returns:
+            A boolean array of shape (channels, frames), True for keys to keep
+    '''
+    times = numpy.asarray(times, dtype=numpy.float64)
+    values = numpy.atleast_2d(numpy.asarray(values, dtype=numpy.float64))
+    channels, frames = values.shape
+
+    tolerance = numpy.broadcast_to(
+        numpy.asarray(tolerance, dtype=numpy.float64).reshape(-1, 1), (channels, 1))
+
+    keep = numpy.zeros((channels, frames), dtype=bool)
+    keep[:, 0] = True
+    keep[:, -1] = True
+
+    if frames <= 2:
+        return keep
+
+    index = numpy.arange(frames)
+
+    # channels that still have a segment over tolerance
+    active = numpy.arange(channels)
+
+    while len(active):
+        active_keep = keep[active]
+        active_values = values[active]
+
+        # index of the kept key before and after every sample
+        prev_key = numpy.maximum.accumulate(numpy.where(active_keep, index, 0), axis=1)
+        next_key = numpy.minimum.accumulate(
+            numpy.where(active_keep, index, frames - 1)[:, ::-1], axis=1)[:, ::-1]
+
+        t0 = times[prev_key]
+        t1 = times[next_key]
+        v0 = numpy.take_along_axis(active_values, prev_key, axis=1)
+        v1 = numpy.take_along_axis(active_values, next_key, axis=1)
+
+        span = t1 - t0
+        fraction = numpy.divide(times - t0, span, out=numpy.zeros_like(span), where=span > 0)
+        error = numpy.abs(active_values - (v0 + (v1 - v0) * fraction))
+        error[active_keep] = 0.0
+
+        # every row starts with a kept key, so the flattened segments are
+        # the runs that start at each kept key
+        flat_keep = active_keep.ravel()
+        flat_error = error.ravel()
+        segment = numpy.cumsum(flat_keep) - 1
+        segment_max = numpy.maximum.reduceat(flat_error, numpy.flatnonzero(flat_keep))
+
+        # keep the worst sample of every segment that is over tolerance
+        worst = (flat_error == segment_max[segment]) & (error > tolerance[active]).ravel()
+        worst = numpy.flatnonzero(worst)
+        first = numpy.ones(len(worst), dtype=bool)
+        first[1:] = segment[worst][1:] != segment[worst][:-1]
+        worst = worst[first]
+
+        rows, cols = numpy.divmod(worst, frames)
+        keep[active[rows], cols] = True
+        active = active[numpy.unique(rows)]
+
+    return keep
+
+
+def reduce_baked_keys(nodes, tolerances=None):
+    '''
+    Removes redundant keys from the animation curves on nodes, e.g. the rig
+    joints right after bakeResults(), and reports the key count before and after.
+
+        Parameters:
+            nodes (list of strings): Nodes whose animation curves are reduced
+            tolerances (dictionary): Attribute name prefix -> tolerance,
+                defaults to DEFAULT_TOLERANCES
+
+        Returns:
+            A dictionary {'keys_before', 'keys_after'}
+    '''
+    import maya.cmds
+
+    curves = maya.cmds.keyframe(nodes, q=True, name=True) or []
+
+    # baked curves share their key times, so group them and reduce
+    # each group as one array
+    groups = dict()
+    for c in curves:
+        curve_times = tuple(maya.cmds.keyframe(c, q=True, timeChange=True) or [])
+        if curve_times:
+            groups.setdefault(curve_times, []).append(c)
+
+    keys_before = 0
+    keys_after = 0
+
+    for curve_times, group in groups.items():
+        values = [maya.cmds.keyframe(c, q=True, valueChange=True) for c in group]
+        channel_tolerances = []
+        for c in group:
+            plugs = maya.cmds.listConnections(c + '.output', plugs=True, source=False) or ['']
+            attribute = maya.cmds.attributeName(plugs[0], long=True) if plugs[0] else ''
+            channel_tolerances.append(tolerance_for_attribute(attribute, tolerances))
+
+        keep = reduce_channels(curve_times, values, channel_tolerances)
+
+        for c, curve_keep in zip(group, keep):
+            removed = [(t, t) for t, k in zip(curve_times, curve_keep) if not k]
+            if removed:
+                maya.cmds.cutKey(c, time=removed, clear=True)
+                maya.cmds.keyTangent(c, inTangentType='linear', outTangentType='linear')
+
+        keys_before += keep.size
+        keys_after += int(keep.sum())
+
+    print('Key reduction: {} keys -> {} keys'.format(keys_before, keys_after))
+
+    return {'keys_before': keys_before, 'keys_after': keys_after}
+
+
+###############  Benchmark  ###############
+
+
+def benchmark(channels=600, frames=2000, tolerance=0.01, seed=0):
+    '''
+    Times reduce_channels() on synthetic baked curves (smooth motion with a
+    little noise and some flat channels) and prints the key counts
+    '''
+    rng = numpy.random.RandomState(seed)
+    times = numpy.arange(frames, dtype=numpy.float64)
+
+    frequency = rng.uniform(0.001, 0.05, size=(channels, 1))
+    amplitude = rng.uniform(0.0, 10.0, size=(channels, 1))
+    amplitude[::4] = 0.0
+    values = amplitude * numpy.sin(times * frequency) + rng.normal(0.0, tolerance * 0.1, (channels, frames))
+
+    keep = []
+    seconds = timeit.timeit(lambda: keep.append(reduce_channels(times, values, tolerance)), number=1)
+
+    print('{} channels x {} frames in {:.3f}s'.format(channels, frames, seconds))
+    print('  keys: {} -> {}'.format(keep[0].size, int(keep[0].sum())))
+
+
+if __name__ == '__main__':
+    benchmark()
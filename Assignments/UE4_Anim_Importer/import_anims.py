@@ -1,18 +1,102 @@
 import unreal
 import os
+import itertools
+from file_discovery import discover_files
+from import_option_templates import ImportOptionTemplates
+from fbx_prescan import route_files
 
-def get_inputs_from_folder(shot_folder, skeleton, destination_path):
-    # creates a list of fbx files from the given shot_folder
-    anim_files = [os.path.join(shot_folder, f) for f in os.listdir(
-        shot_folder) if (os.path.exists(os.path.join(shot_folder, f)) and f.endswith('.fbx'))]
+def get_inputs_from_folder(shot_folder, skeleton, destination_path, recursive=False, chunk_size=50,
+                           options_override=None, prescan=False):
+    # lazily finds the fbx files in the given shot_folder (and its sub folders if recursive)
+    anim_files = discover_files(shot_folder, include=['*.fbx'], recursive=recursive)
+
+    # with prescan, the files are read outside the editor first (in a process pool)
+    # and only the ones that hold skeleton animation are imported, including
+    # animations exported along with their skinned mesh
+    if prescan:
+        anims, skipped = route_files(anim_files, has_animation=True)
+        for r in skipped:
+            unreal.log_warning('Skipping {} ({}): {}'.format(r['path'], r['kind'], r['error'] or 'not an animation'))
+        anim_files = [r['path'] for r in anims]
+
+    # the import options are built once for the skeleton and shared by every task.
+    # options_override(input_path, template_options) can return different options for a file
+    templates = ImportOptionTemplates()
     
-    # for each file in anim_files, import the animation
-    for a in anim_files:
-        import_skeletal_animations(skeleton, a, destination_path)
+    # build an import task for every file and import them chunk_size at a time,
+    # returns the paths of every imported asset
+    tasks = (build_anim_import_task(skeleton, a, destination_path, templates.options_for(
+        a, 'anim', anim_import_options, options_override, skeleton=skeleton)) for a in anim_files)
+    return import_tasks_in_chunks(tasks, chunk_size)
+
+
+def import_tasks_in_chunks(tasks, chunk_size=50):
+
+    # submits the tasks to AssetTools chunk_size at a time and saves what each
+    # chunk imported once the chunk is done. Only one chunk of tasks is held at
+    # a time and garbage is collected after each save, so chunk_size caps the
+    # peak editor memory on very large folders
+
+    asset_tools = unreal.AssetToolsHelpers.get_asset_tools()
+    tasks = iter(tasks)
+    imported_paths = []
+
+    while True:
+        chunk = list(itertools.islice(tasks, chunk_size))
+        if not chunk:
+            break
+
+        unreal.AssetTools.import_asset_tasks(asset_tools, chunk)
+
+        chunk_paths = []
+        for task in chunk:
+            chunk_paths.extend(task.get_editor_property("imported_object_paths"))
+
+        for path in chunk_paths:
+            unreal.EditorAssetLibrary.save_asset(path, only_if_is_dirty=False)
+
+        imported_paths.extend(chunk_paths)
+        unreal.SystemLibrary.collect_garbage()
+
+    return imported_paths
 
 
 def import_skeletal_animations(skeleton, input_path, destination_path):
 
+    # imports and saves a single animation
+
+    asset_import_task = build_anim_import_task(skeleton, input_path, destination_path)
+    asset_import_task.set_editor_property("save", True)
+
+    tasks = [asset_import_task]
+
+    asset_tools = unreal.AssetToolsHelpers.get_asset_tools()
+
+    unreal.AssetTools.import_asset_tasks(asset_tools, tasks)
+
+
+def build_anim_import_task(skeleton, input_path, destination_path, ui_import_options=None):
+
+    # builds fresh import options unless shared ones are given
+
+    if ui_import_options is None:
+        ui_import_options = anim_import_options(skeleton)
+
+    # import animation w/ option, input path, and destination path
+    # saving is left to the caller so it can be done once per batch
+
+    asset_import_task = unreal.AssetImportTask()
+    asset_import_task.set_editor_property("automated", True)
+    asset_import_task.set_editor_property("destination_path", destination_path)
+    asset_import_task.set_editor_property("filename", input_path)
+    asset_import_task.set_editor_property("options", ui_import_options)
+    asset_import_task.set_editor_property("save", False)
+
+    return asset_import_task
+
+
+def anim_import_options(skeleton):
+
     # setting animation section options
 
     anim_seq_import_data = unreal.FbxAnimSequenceImportData()
@@ -40,47 +124,137 @@ def import_skeletal_animations(skeleton, input_path, destination_path):
     ui_import_options.set_editor_property("skeleton", skeleton)
     ui_import_options.set_editor_property("anim_sequence_import_data", anim_seq_import_data)
 
-    # import animation w/ option, input path, and destination path
+    return ui_import_options
 
-    asset_import_task = unreal.AssetImportTask()
-    asset_import_task.set_editor_property("automated", True)
-    asset_import_task.set_editor_property("destination_path", destination_path)
-    asset_import_task.set_editor_property("filename", input_path)
-    asset_import_task.set_editor_property("options", ui_import_options)
-    asset_import_task.set_editor_property("save", True)
 
-    tasks = [asset_import_task]
+def build_level_sequence(sequence, shot_list, append=False):
+
+    # builds every track of a level sequence from a whole shot list in one pass.
+    # sequence is a LevelSequence or the asset path of one, which is created if it
+    # does not exist. shot_list maps each actor to a list of (animation, start_frame)
+    # pairs, where animation is an AnimSequence or its asset path, i.e:
+    #   {character_actor: [('/Game/Anims/walk', 0), ('/Game/Anims/run', 48)]}
+    # an actor already bound in the sequence keeps its binding and animation track,
+    # whose sections are replaced, or kept and added to if append is True.
+    # every animation asset is loaded once however many times it is used, and the
+    # sequence is saved once at the end. Returns the sequence
+
+    if not isinstance(sequence, unreal.LevelSequence):
+        sequence = load_or_create_level_sequence(sequence)
+
+    fps = sequence_fps(sequence)
+    animations = dict()
+    end_frame = 0
+
+    for actor, clips in shot_list.items():
+        track = find_or_add_animation_track(sequence, actor)
+
+        for section in track.get_sections():
+            if append:
+                end_frame = max(end_frame, section.get_end_frame())
+            else:
+                track.remove_section(section)
+
+        for animation, start_frame in clips:
+            asset_path = animation
+            if not isinstance(animation, unreal.AnimSequence):
+                if animation not in animations:
+                    animations[animation] = unreal.load_asset(animation)
+                animation = animations[animation]
+
+            if not isinstance(animation, unreal.AnimSequence):
+                unreal.log_warning("Skipping {}, it is not an animation".format(asset_path))
+                continue
+
+            params = unreal.MovieSceneSkeletalAnimationParams()
+            params.set_editor_property("animation", animation)
+
+            section_end = start_frame + animation_frames(animation, fps)
+
+            section = track.add_section()
+            section.set_editor_property("params", params)
+            section.set_range(start_frame, section_end)
+
+            end_frame = max(end_frame, section_end)
+
+    sequence.set_playback_start(0)
+    sequence.set_playback_end(end_frame)
+
+    unreal.EditorAssetLibrary.save_loaded_asset(sequence)
+
+    return sequence
+
+
+def find_or_add_animation_track(sequence, actor):
+
+    # returns the skeletal animation track of actor's binding in sequence.
+    # the binding and the track are only added when the sequence has none, so
+    # building the same sequence again does not stack duplicates
+
+    label = actor.get_actor_label()
+    binding = None
+    for possessable in sequence.get_possessables():
+        if possessable.get_display_name() == label:
+            binding = possessable
+            break
+
+    if binding is None:
+        binding = sequence.add_possessable(object_to_possess=actor)
 
+    tracks = binding.find_tracks_by_exact_type(unreal.MovieSceneSkeletalAnimationTrack)
+    if tracks:
+        return tracks[0]
+
+    return binding.add_track(track_type=unreal.MovieSceneSkeletalAnimationTrack)
+
+
+def load_or_create_level_sequence(sequence_path):
+
+    # loads the level sequence at sequence_path, creating it if it does not exist
+
+    if unreal.EditorAssetLibrary.does_asset_exist(sequence_path):
+        return unreal.LevelSequence.cast(unreal.load_asset(sequence_path))
+
+    package_path, asset_name = sequence_path.rsplit("/", 1)
     asset_tools = unreal.AssetToolsHelpers.get_asset_tools()
+    return asset_tools.create_asset(asset_name, package_path, unreal.LevelSequence,
+                                    unreal.LevelSequenceFactoryNew())
 
-    unreal.AssetTools.import_asset_tasks(asset_tools, tasks)
 
-'''
-Attempted challenge #1, didn't quite get there
-
-
-def get_or_add_possessable_in_sequence_asset(sequence_path, actor):
-    sequence_asset = unreal.LevelSequence.cast(unreal.load_asset(sequence_path))
-    possessable = sequence_asset.add_possessable(object_to_possess=actor)
-    return possessable
-
-def add_skeletal_animation_track_on_possessable(animation_path, possessable):
-    # Get Animation
-    animation_asset = unreal.AnimSequence.cast(unreal.load_asset(animation_path))
-    params = unreal.MovieSceneSkeletalAnimationParams()
-    params.set_editor_property('Animation', animation_asset)
-    # Add track
-    animation_track = possessable.add_track(track_type=unreal.MovieSceneSkeletalAnimationTrack)
-    # Add section
-    animation_section = animation_track.add_section()
-    animation_section.set_editor_property('Params', params)
-    animation_section.set_range(0, animation_asset.get_editor_property('sequence_length'))
-
-
-def add_skeletal_animation_track_on_actor():
-    sequence_path = '/ktach_wk10_anim_importer/test_seq'
-    animation_path = '/Game/Animations/SKP_0240_Character'
-    actor_in_world =  unreal.EditorLevelLibrary().get_actor_reference('/wk10_sample_content/character')
-    possessable_in_sequence = get_or_add_possessable_in_sequence_asset(sequence_path, actor_in_world)
-    add_skeletal_animation_track_on_possessable(animation_path, possessable_in_sequence)
-'''
\ No newline at end of file
+def sequence_fps(sequence):
+
+    # display rate of the sequence in frames per second
+
+    frame_rate = sequence.get_display_rate()
+    return float(frame_rate.numerator) / frame_rate.denominator
+
+
+def animation_frames(animation, fps):
+
+    # sequence_length is in seconds, sections are set in display rate frames
+
+    return int(round(animation.get_editor_property("sequence_length") * fps))
+
+
+def import_shot_sequence(shot_folder, skeleton, destination_path, sequence_path, actor, gap=0, **kwargs):
+
+    # imports the animations in shot_folder (see get_inputs_from_folder, which
+    # kwargs are passed to) and lays them out back to back, gap frames apart,
+    # on actor in the level sequence at sequence_path. Returns the sequence
+
+    imported_paths = get_inputs_from_folder(shot_folder, skeleton, destination_path, **kwargs)
+
+    sequence = load_or_create_level_sequence(sequence_path)
+    fps = sequence_fps(sequence)
+
+    clips = []
+    start_frame = 0
+    for path in sorted(imported_paths):
+        animation = unreal.load_asset(path)
+        if not isinstance(animation, unreal.AnimSequence):
+            continue
+
+        clips.append((animation, start_frame))
+        start_frame += animation_frames(animation, fps) + gap
+
+    return build_level_sequence(sequence, {actor: clips})